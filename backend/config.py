@@ -7,18 +7,34 @@ This module manages all configuration settings including:
 - Environment-specific configurations
 """
 
-from typing import List, Optional
-import json
+from typing import Annotated, List, Optional, Tuple
+from functools import cached_property, lru_cache
+import os
 from pydantic import Field, field_validator
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, NoDecode, SettingsConfigDict
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file once per process tree. Forked
+# uvicorn workers and test subprocesses inherit the flag and skip re-parsing.
+if not os.getenv("_DOTENV_LOADED"):
+    load_dotenv()
+    os.environ["_DOTENV_LOADED"] = "1"
+
+def _normalize_origin(origin: str) -> str:
+    """Trim whitespace, stray quotes, and trailing slashes from an origin."""
+    return origin.strip().strip('"').strip("'").rstrip("/")
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
-    
+
+    # Settings are effectively immutable after startup, but tests monkeypatch
+    # individual fields, so frozen=True is deliberately not set here.
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=True,
+    )
+
     # Application settings
     APP_NAME: str = "Quantum PDF Chatbot Backend"
     VERSION: str = "1.0.0"
@@ -31,14 +47,37 @@ class Settings(BaseSettings):
     # ChromaDB settings (additional)
     CHROMADB_HOST: str = Field(default="localhost", env="CHROMADB_HOST")
     CHROMADB_PORT: int = Field(default=8000, env="CHROMADB_PORT")
+    # "embedded" runs SQLite/HNSW inside this process; "server" connects to a
+    # standalone `chroma run` instance at CHROMADB_HOST:CHROMADB_PORT so index
+    # work happens in its own process and address space.
+    CHROMA_MODE: str = Field(default="embedded", env="CHROMA_MODE")
+    # Metadata keys kept as first-class Chroma columns (comma-separated).
+    # When set, all other keys are packed into one JSON blob per row, which
+    # shrinks the embedding_metadata table — but native where-filters then
+    # only work on the listed keys (session_id/user_id always stay
+    # first-class). Empty disables packing.
+    CHROMA_FILTERABLE_KEYS: Annotated[Tuple[str, ...], NoDecode] = Field(
+        default=(), env="CHROMA_FILTERABLE_KEYS"
+    )
+    # Issue one dummy query after opening the collection so the HNSW graph
+    # and SQLite pages are paged in before the first real request.
+    CHROMA_WARMUP: bool = Field(default=True, env="CHROMA_WARMUP")
     
     # Server settings
     HOST: str = Field(default="0.0.0.0", env="HOST")
     PORT: int = Field(default=8000, env="PORT")
     
-    # CORS settings
-    ALLOWED_ORIGINS: str = Field(
-        default="https://idp-frontend-798522160894.asia-south1.run.app,http://localhost:5173,http://localhost:3000,http://localhost:8080,http://127.0.0.1:3000,http://127.0.0.1:5173",
+    # CORS settings. NoDecode skips pydantic-settings' JSON decode of the env
+    # value so the before-validator below can do a plain comma-split instead.
+    ALLOWED_ORIGINS: Annotated[Tuple[str, ...], NoDecode] = Field(
+        default=(
+            "https://idp-frontend-798522160894.asia-south1.run.app",
+            "http://localhost:5173",
+            "http://localhost:3000",
+            "http://localhost:8080",
+            "http://127.0.0.1:3000",
+            "http://127.0.0.1:5173",
+        ),
         env="ALLOWED_ORIGINS"
     )
     
@@ -51,10 +90,29 @@ class Settings(BaseSettings):
     
     # Gemini API settings
     GEMINI_API_KEY: Optional[str] = Field(default=None, env="GEMINI_API_KEY")
+    GEMINI_MAX_INFLIGHT: int = Field(default=8, env="GEMINI_MAX_INFLIGHT")
     
     # ChromaDB settings
     CHROMA_DB_PATH: str = Field(default="./chroma_db", env="CHROMA_DB_PATH")
     CHROMA_COLLECTION_NAME: str = Field(default="pdf_documents", env="CHROMA_COLLECTION_NAME")
+    CHROMA_ADD_BATCH_SIZE: int = Field(default=128, env="CHROMA_ADD_BATCH_SIZE")  # Documents per collection.add call
+    CHROMA_INSERT_CONCURRENCY: int = Field(default=2, env="CHROMA_INSERT_CONCURRENCY")  # Concurrent add batches in flight
+    CHROMA_DELETE_BATCH_SIZE: int = Field(default=500, env="CHROMA_DELETE_BATCH_SIZE")  # IDs per delete transaction
+    # Relax SQLite durability (WAL, synchronous=NORMAL) on Chroma's backing
+    # database for bulk ingestion; a crash mid-ingest can lose recent writes.
+    CHROMA_BULK_MODE: bool = Field(default=False, env="CHROMA_BULK_MODE")
+    EMBEDDING_CACHE_TTL: float = Field(default=300.0, env="EMBEDDING_CACHE_TTL")  # Seconds a cached full scan stays valid
+    EMBEDDING_PAGE_SIZE: int = Field(default=5000, env="EMBEDDING_PAGE_SIZE")  # Rows per page when scanning all embeddings
+    QUERY_CACHE_SIZE: int = Field(default=512, env="QUERY_CACHE_SIZE")  # Cached similarity_search result sets
+    # HNSW index parameters applied at collection creation. Denser graphs
+    # (higher M) and wider candidate lists (higher ef) raise recall at the
+    # cost of build time and per-query latency.
+    HNSW_M: int = Field(default=24, env="HNSW_M")
+    HNSW_EF_CONSTRUCTION: int = Field(default=128, env="HNSW_EF_CONSTRUCTION")
+    HNSW_EF_SEARCH: int = Field(default=100, env="HNSW_EF_SEARCH")
+    # In-process dtype for full-scan embedding caches: "float32" (exact) or
+    # "float16" (half the resident memory; ranking upcasts on use).
+    VECTOR_DTYPE: str = Field(default="float32", env="VECTOR_DTYPE")
     
     # Supabase settings
     SUPABASE_URL: Optional[str] = Field(default=None, env="SUPABASE_URL")
@@ -72,6 +130,10 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = Field(default=10 * 1024 * 1024, env="MAX_FILE_SIZE")  # 10MB
     CHUNK_SIZE: int = Field(default=1000, env="CHUNK_SIZE")  # Characters per chunk
     CHUNK_OVERLAP: int = Field(default=200, env="CHUNK_OVERLAP")  # Overlap between chunks
+    EMBED_BATCH_SIZE: int = Field(default=64, env="EMBED_BATCH_SIZE")  # Texts per encoder batch
+    EMBED_CACHE_PATH: str = Field(default="./embed_cache.sqlite3", env="EMBED_CACHE_PATH")
+    PDF_WORKER_CONCURRENCY: int = Field(default=2, env="PDF_WORKER_CONCURRENCY")  # Queued upload workers
+    EMBED_MAX_INFLIGHT: int = Field(default=2, env="EMBED_MAX_INFLIGHT")  # Concurrent encoder forward passes
     
     # Quantum computing settings
     QUANTUM_BACKEND: str = Field(default="qasm_simulator", env="QUANTUM_BACKEND")
@@ -79,10 +141,14 @@ class Settings(BaseSettings):
     QUANTUM_MAX_QUBITS: int = Field(default=10, env="QUANTUM_MAX_QUBITS")
     QUANTUM_BOOST_FACTOR: float = Field(default=2.0, env="QUANTUM_BOOST_FACTOR")
     GROVER_ITERATIONS: int = Field(default=2, env="GROVER_ITERATIONS")
+    # Sample Grover outcomes from an Aer circuit simulation instead of the
+    # closed-form distribution; slower, kept for research parity.
+    QUANTUM_USE_REAL_SIMULATOR: bool = Field(default=False, env="QUANTUM_USE_REAL_SIMULATOR")
     
     # Search settings
     MAX_SEARCH_RESULTS: int = Field(default=5, env="MAX_SEARCH_RESULTS")
     SIMILARITY_THRESHOLD: float = Field(default=0.7, env="SIMILARITY_THRESHOLD")
+    EXTRACTIVE_THRESHOLD: float = Field(default=0.88, env="EXTRACTIVE_THRESHOLD")
     
     # Logging settings
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
@@ -91,6 +157,43 @@ class Settings(BaseSettings):
         env="LOG_FORMAT"
     )
 
+    @field_validator("ALLOWED_ORIGINS", mode="before")
+    @classmethod
+    def parse_allowed_origins(cls, value):
+        """Split ALLOWED_ORIGINS from its env string without a JSON round-trip.
+
+        Accepts comma-separated strings as well as odd deployment formats like
+        `['https://...']` or quoted origins.
+        """
+        if value is None or value == "":
+            return ()
+
+        if isinstance(value, str):
+            # Strip JSON-ish brackets and split; per-origin quotes are
+            # removed by _normalize_origin.
+            cleaned = value.strip().lstrip("[").rstrip("]")
+            return tuple(
+                origin
+                for origin in (_normalize_origin(part) for part in cleaned.split(","))
+                if origin
+            )
+
+        return tuple(value)
+
+    @field_validator("CHROMA_FILTERABLE_KEYS", mode="before")
+    @classmethod
+    def parse_filterable_keys(cls, value):
+        """Split CHROMA_FILTERABLE_KEYS from a comma-separated env string."""
+        if value is None or value == "":
+            return ()
+
+        if isinstance(value, str):
+            return tuple(
+                key for key in (part.strip() for part in value.split(",")) if key
+            )
+
+        return tuple(value)
+
     @field_validator("DEBUG", mode="before")
     @classmethod
     def normalize_debug(cls, value):
@@ -110,42 +213,20 @@ class Settings(BaseSettings):
 
         return value
 
-    @property
+    @cached_property
     def allowed_origins_list(self) -> List[str]:
-        """Return CORS origins parsed from ALLOWED_ORIGINS (JSON array or comma-separated string)."""
+        """Return CORS origins from ALLOWED_ORIGINS plus the always-required set."""
         required_origins = {
             "https://idp-frontend-798522160894.asia-south1.run.app",
             "http://localhost:5173",
             "http://localhost:8080",
         }
 
-        def normalize(origin: str) -> str:
-            return origin.strip().strip('"').strip("'").rstrip("/")
-
-        raw = (self.ALLOWED_ORIGINS or "").strip()
-        if not raw:
-            return sorted(required_origins)
-
-        parsed_origins: List[str] = []
-
-        if raw.startswith("["):
-            try:
-                parsed = json.loads(raw)
-                if isinstance(parsed, list):
-                    parsed_origins = [normalize(str(origin)) for origin in parsed if normalize(str(origin))]
-            except json.JSONDecodeError:
-                parsed_origins = []
-
-        if not parsed_origins:
-            # Handle odd env formats like ['https://...'] or "https://...".
-            cleaned = raw.strip().lstrip("[").rstrip("]")
-            parsed_origins = [normalize(origin) for origin in cleaned.split(",") if normalize(origin)]
-
-        return sorted(set(parsed_origins).union(required_origins))
+        return sorted(set(self.ALLOWED_ORIGINS).union(required_origins))
     
-    @property
+    @cached_property
     def database_url(self) -> str:
-        """Construct PostgreSQL database URL from components."""
+        """Construct PostgreSQL database URL from components (computed once)."""
         if self.DATABASE_URL:
             return self.DATABASE_URL
         return (
@@ -153,43 +234,38 @@ class Settings(BaseSettings):
             f"@{self.POSTGRES_HOST}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
         )
     
-    @property
-    def use_huggingface(self) -> bool:
-        """Check if HuggingFace is available for embeddings."""
-        return True  # Always use HuggingFace for embeddings
-    
-    class Config:
-        """Pydantic configuration."""
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = True
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the cached Settings instance.
+
+    Constructing Settings triggers the full pydantic schema/env parse, so the
+    instance is built once per process and reused everywhere.
+    """
+    return Settings()
 
 # Create global settings instance
-settings = Settings()
+settings = get_settings()
+
+# HuggingFace is always the embedding service, so the validation result is a
+# process-wide constant rather than something rebuilt per call.
+_VALIDATION_RESULT = {
+    "huggingface_available": True,
+    "embedding_service": "huggingface",
+    "warnings": []
+}
 
-# Validation functions
 def validate_api_keys() -> dict:
     """Validate that required API keys are present.
-    
+
     Returns:
         dict: Validation results with available services
     """
-    validation_results = {
-        "huggingface_available": settings.use_huggingface,
-        "embedding_service": "huggingface",
-        "warnings": []
-    }
-    
-    if not settings.use_huggingface:
-        validation_results["warnings"].append(
-            "HuggingFace embedding service not available."
-        )
-    
-    return validation_results
+    return _VALIDATION_RESULT
 
+@lru_cache(maxsize=1)
 def get_embedding_config() -> dict:
-    """Get the HuggingFace embedding configuration.
-    
+    """Get the HuggingFace embedding configuration (built once).
+
     Returns:
         dict: Embedding service configuration
     """
@@ -202,6 +278,7 @@ def get_embedding_config() -> dict:
 # Export commonly used settings
 __all__ = [
     "settings",
+    "get_settings",
     "validate_api_keys",
     "get_embedding_config"
 ]
@@ -7,13 +7,18 @@ This is the main entry point for the FastAPI application that provides:
 - HuggingFace embeddings integration
 """
 
+import os
+
+import anyio
 import uvicorn
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 import logging
-from datetime import datetime
+import re
+import time
+from datetime import datetime, timezone
 
 # Import configuration
 from config import settings
@@ -41,7 +46,13 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Quantum PDF Chatbot Backend...")
     logger.info("Resolved CORS origins: %s", settings.allowed_origins_list)
-    
+
+    # Widen AnyIO's default 40-slot thread pool: Gemini calls, embedding
+    # encodes, and temp-file cleanup all run via worker threads and would
+    # otherwise queue behind each other under load.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 200
+
+
     try:
         # Initialize all shared services (VectorStore, PDFProcessor, etc.)
         await initialize_services()
@@ -65,34 +76,49 @@ app = FastAPI(
     title="Quantum PDF Chatbot Backend",
     description="AI-powered PDF chatbot with quantum-enhanced search using Grover's Algorithm",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
-# Configure CORS middleware
+# Configure CORS middleware. A precompiled origin regex replaces the per-request
+# list scan, and the explicit method/header shortlists let the middleware
+# short-circuit instead of wildcard-matching every preflight.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.allowed_origins_list,
+    allow_origins=[],
+    allow_origin_regex="|".join(map(re.escape, settings.allowed_origins_list)),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+    allow_headers=["authorization", "content-type"],
 )
 
+# Cached /health payload. Liveness probes can hit this endpoint every second
+# per replica, so the response body is memoized for a short window.
+_HEALTH_CACHE_TTL_SECONDS = 0.5
+_health_cache = (0.0, None)
+
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
     """Health check endpoint to verify the API is running.
-    
+
     Returns:
         dict: Status information including timestamp and service health
     """
+    global _health_cache
+
+    expiry, cached_payload = _health_cache
+    if cached_payload is not None and time.monotonic() < expiry:
+        return cached_payload
+
     try:
         # Check if vector store is initialized
         vector_store = get_vector_store()
         vector_store_status = "healthy" if vector_store and vector_store.client else "not_initialized"
-        
-        return {
+
+        payload = {
             "status": "ok",
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
             "version": "1.0.0",
             "services": {
                 "vector_store": vector_store_status,
@@ -101,6 +127,8 @@ async def health_check():
             },
             "environment": settings.ENVIRONMENT
         }
+        _health_cache = (time.monotonic() + _HEALTH_CACHE_TTL_SECONDS, payload)
+        return payload
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail="Service unhealthy")
@@ -117,13 +145,13 @@ app.include_router(auth_router, tags=["Authentication"])
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for unhandled errors."""
     if isinstance(exc, HTTPException):
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=exc.status_code,
             content={"detail": exc.detail}
         )
 
     logger.exception("Unhandled exception on %s %s", request.method, request.url.path)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"error": str(exc)}
     )
@@ -140,11 +168,22 @@ async def root():
     }
 
 if __name__ == "__main__":
-    # Run the application
+    # Run the application. uvloop/httptools ship with uvicorn[standard]; the
+    # stat-polling reloader is kept to development only. Multiple workers
+    # are only safe against a standalone Chroma server: the embedded store
+    # is not multi-process safe, and in-process state (upload-job tracking,
+    # the known_empty probe, result caches) is per worker.
     uvicorn.run(
         "main:app",
         host=settings.HOST,
         port=settings.PORT,
-        reload=True,
+        reload=settings.DEBUG,
+        loop="uvloop",
+        http="httptools",
+        workers=(
+            (os.cpu_count() or 1)
+            if not settings.DEBUG and settings.CHROMA_MODE == "server"
+            else 1
+        ),
         log_level="info"
     )
@@ -7,15 +7,19 @@ This module handles:
 - User profile management
 """
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Annotated, Dict, Any, Optional
 from datetime import datetime
 import hashlib
 import secrets
 
+# Password hashing (Argon2id)
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+
 # FastAPI imports
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, EmailStr
 
 # Services
@@ -29,6 +33,9 @@ logger = logging.getLogger(__name__)
 # Create router
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
 
+# Shared dependency annotation; FastAPI caches the resolved service per request.
+DatabaseDep = Annotated[DatabaseService, Depends(get_database_service)]
+
 # Pydantic models for request/response
 class UserRegistrationRequest(BaseModel):
     """Request model for user registration."""
@@ -38,8 +45,13 @@ class UserRegistrationRequest(BaseModel):
     phone_number: Optional[str] = Field(default=None, max_length=20, description="User's phone number")
 
 class UserLoginRequest(BaseModel):
-    """Request model for user login."""
-    email: EmailStr = Field(..., description="User's email address")
+    """Request model for user login.
+
+    The email is a plain string here: full email-format validation only
+    matters at registration, and skipping the email-validator pass keeps the
+    login hot path cheap — unknown addresses simply fail the lookup.
+    """
+    email: str = Field(..., min_length=3, max_length=254, description="User's email address")
     password: str = Field(..., description="User's password")
 
 class UserResponse(BaseModel):
@@ -49,65 +61,83 @@ class UserResponse(BaseModel):
     message: str
     token: Optional[str] = None
 
+# Argon2id hasher shared by all auth endpoints. Moderate parameters keep
+# per-login CPU bounded while remaining a real password KDF (unlike the
+# previous single SHA-256 pass).
+_password_hasher = PasswordHasher(time_cost=2, memory_cost=64 * 1024, parallelism=1)
+
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256 with salt.
-    
+    """Hash a password using Argon2id.
+
     Args:
         password: Plain text password
-        
+
     Returns:
         Hashed password string
     """
-    # Generate a random salt
-    salt = secrets.token_hex(16)
-    # Hash the password with salt
-    password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-    return f"{salt}:{password_hash}"
+    return _password_hasher.hash(password)
+
+def _verify_legacy_password(password: str, hashed_password: str) -> bool:
+    """Verify a password against a legacy `salt:sha256` hash."""
+    try:
+        salt, stored_hash = hashed_password.split(':')
+        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
+        return secrets.compare_digest(password_hash, stored_hash)
+    except ValueError:
+        return False
 
 def verify_password(password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash.
-    
+    """Verify a password against its stored hash.
+
+    Supports Argon2id hashes as well as legacy `salt:hash` SHA-256 rows
+    created before the Argon2 migration.
+
     Args:
         password: Plain text password
-        hashed_password: Stored hash with salt
-        
+        hashed_password: Stored password hash
+
     Returns:
         True if password matches, False otherwise
     """
+    if hashed_password.startswith("$argon2"):
+        try:
+            return _password_hasher.verify(hashed_password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return _verify_legacy_password(password, hashed_password)
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Check whether a stored hash should be upgraded to current Argon2 parameters."""
+    if not hashed_password.startswith("$argon2"):
+        return True  # Legacy salt:sha256 row
     try:
-        salt, stored_hash = hashed_password.split(':')
-        password_hash = hashlib.sha256((password + salt).encode()).hexdigest()
-        return password_hash == stored_hash
-    except ValueError:
-        return False
+        return _password_hasher.check_needs_rehash(hashed_password)
+    except InvalidHashError:
+        return True
 
-def generate_simple_token(user_id: int, email: str) -> str:
+def generate_simple_token() -> str:
     """Generate a simple token for user authentication.
-    
-    Args:
-        user_id: User's ID
-        email: User's email
-        
+
     Returns:
         Simple authentication token
     """
-    # This is a simple token generation - in production, use JWT or similar
-    token_data = f"{user_id}:{email}:{secrets.token_hex(16)}"
-    return hashlib.sha256(token_data.encode()).hexdigest()
+    # This is a simple token generation - in production, use JWT or similar.
+    # The CSPRNG output is the token; hashing it again adds no entropy.
+    return secrets.token_urlsafe(32)
 
-@router.post("/register", response_model=UserResponse)
+@router.post("/register", response_model=UserResponse, status_code=201)
 async def register_user(
     request: UserRegistrationRequest,
-    database: DatabaseService = Depends(get_database_service)
-) -> JSONResponse:
+    database: DatabaseDep
+) -> UserResponse:
     """Register a new user.
-    
+
     Args:
         request: User registration data
         database: Database service instance
-        
+
     Returns:
-        JSONResponse: Registration result with user data
+        UserResponse: Registration result with user data
     """
     try:
         logger.info(
@@ -119,42 +149,39 @@ async def register_user(
             },
         )
         
-        # Check if user already exists
-        existing_user = await database.get_user_by_email(request.email)
-        if existing_user:
-            raise HTTPException(
-                status_code=409,
-                detail="User with this email already exists"
-            )
-        
-        # Hash the password
-        hashed_password = hash_password(request.password)
-        
-        # Create the user
-        result = await database.create_user(
+        # Hash the password off the event loop — Argon2id is deliberately
+        # expensive and would otherwise stall every other coroutine.
+        hashed_password = await asyncio.to_thread(hash_password, request.password)
+
+        # Create the user atomically; duplicates are rejected server-side in
+        # the same round trip instead of via a separate exists-check.
+        result = await database.create_user_if_absent(
             full_name=request.full_name,
             email=request.email,
             password=hashed_password,
             phone_number=request.phone_number
         )
-        
+
+        if result.get('duplicate'):
+            raise HTTPException(
+                status_code=409,
+                detail="User with this email already exists"
+            )
+
         if result['success']:
             user_data = result['user']
             # Remove password from response
             user_data.pop('password', None)
             
             # Generate a simple token
-            token = generate_simple_token(user_data['id'], user_data['email'])
+            token = generate_simple_token()
             
-            logger.info(f"User registered successfully: {request.email}")
-            return JSONResponse(
-                status_code=201,
-                content={
-                    "success": True,
-                    "user": user_data,
-                    "message": "User registered successfully",
-                    "token": token
-                }
+            logger.info("User registered successfully: %s", request.email)
+            return UserResponse(
+                success=True,
+                user=user_data,
+                message="User registered successfully",
+                token=token
             )
         else:
             raise HTTPException(
@@ -166,7 +193,7 @@ async def register_user(
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.exception(f"User registration failed for {request.email}: {e}")
+        logger.exception("User registration failed for %s: %s", request.email, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error during registration: {str(e)}"
@@ -175,16 +202,16 @@ async def register_user(
 @router.post("/login", response_model=UserResponse)
 async def login_user(
     request: UserLoginRequest,
-    database: DatabaseService = Depends(get_database_service)
-) -> JSONResponse:
+    database: DatabaseDep
+) -> UserResponse:
     """Authenticate a user.
-    
+
     Args:
         request: User login data
         database: Database service instance
-        
+
     Returns:
-        JSONResponse: Login result with user data and token
+        UserResponse: Login result with user data and token
     """
     try:
         logger.info(
@@ -203,36 +230,41 @@ async def login_user(
                 detail="Invalid email or password"
             )
         
-        # Verify password
-        if not verify_password(request.password, user['password']):
+        # Verify password off the event loop (Argon2id is CPU-bound)
+        password_valid = await asyncio.to_thread(
+            verify_password, request.password, user['password']
+        )
+        if not password_valid:
             raise HTTPException(
                 status_code=401,
                 detail="Invalid email or password"
             )
-        
+
+        # Upgrade legacy/outdated hashes to current Argon2 parameters
+        if password_needs_rehash(user['password']):
+            new_hash = await asyncio.to_thread(hash_password, request.password)
+            await database.update_user_password(user['id'], new_hash)
+
         # Remove password from response
         user_data = user.copy()
         user_data.pop('password', None)
         
         # Generate a simple token
-        token = generate_simple_token(user_data['id'], user_data['email'])
+        token = generate_simple_token()
         
-        logger.info(f"User logged in successfully: {request.email}")
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "user": user_data,
-                "message": "Login successful",
-                "token": token
-            }
+        logger.info("User logged in successfully: %s", request.email)
+        return UserResponse(
+            success=True,
+            user=user_data,
+            message="Login successful",
+            token=token
         )
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.exception(f"User login failed for {request.email}: {e}")
+        logger.exception("User login failed for %s: %s", request.email, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error during login: {str(e)}"
@@ -241,19 +273,19 @@ async def login_user(
 @router.get("/user/{user_id}", response_model=UserResponse)
 async def get_user_profile(
     user_id: int,
-    database: DatabaseService = Depends(get_database_service)
-) -> JSONResponse:
+    database: DatabaseDep
+) -> UserResponse:
     """Get user profile by ID.
-    
+
     Args:
         user_id: User's ID
         database: Database service instance
-        
+
     Returns:
-        JSONResponse: User profile data
+        UserResponse: User profile data
     """
     try:
-        logger.info(f"Getting user profile for ID: {user_id}")
+        logger.info("Getting user profile for ID: %s", user_id)
         
         # Get user by ID
         user = await database.get_user_by_id(user_id)
@@ -267,20 +299,17 @@ async def get_user_profile(
         user_data = user.copy()
         user_data.pop('password', None)
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "user": user_data,
-                "message": "User profile retrieved successfully"
-            }
+        return UserResponse(
+            success=True,
+            user=user_data,
+            message="User profile retrieved successfully"
         )
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Failed to get user profile for ID {user_id}: {e}")
+        logger.error("Failed to get user profile for ID %s: %s", user_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
@@ -289,11 +318,11 @@ async def get_user_profile(
 @router.put("/user/{user_id}", response_model=UserResponse)
 async def update_user_profile(
     user_id: int,
+    database: DatabaseDep,
     full_name: Optional[str] = None,
     email: Optional[str] = None,
     phone_number: Optional[str] = None,
-    database: DatabaseService = Depends(get_database_service)
-) -> JSONResponse:
+) -> UserResponse:
     """Update user profile.
     
     Args:
@@ -304,10 +333,10 @@ async def update_user_profile(
         database: Database service instance
         
     Returns:
-        JSONResponse: Updated user profile data
+        UserResponse: Updated user profile data
     """
     try:
-        logger.info(f"Updating user profile for ID: {user_id}")
+        logger.info("Updating user profile for ID: %s", user_id)
         
         # Update user
         result = await database.update_user(user_id, full_name, email, phone_number)
@@ -322,41 +351,38 @@ async def update_user_profile(
         user_data = result['user'].copy()
         user_data.pop('password', None)
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "user": user_data,
-                "message": "User profile updated successfully"
-            }
+        return UserResponse(
+            success=True,
+            user=user_data,
+            message="User profile updated successfully"
         )
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Failed to update user profile for ID {user_id}: {e}")
+        logger.error("Failed to update user profile for ID %s: %s", user_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
 
-@router.delete("/user/{user_id}")
+@router.delete("/user/{user_id}", response_model=UserResponse)
 async def delete_user_account(
     user_id: int,
-    database: DatabaseService = Depends(get_database_service)
-) -> JSONResponse:
+    database: DatabaseDep
+) -> UserResponse:
     """Delete user account.
-    
+
     Args:
         user_id: User's ID
         database: Database service instance
-        
+
     Returns:
-        JSONResponse: Deletion confirmation
+        UserResponse: Deletion confirmation
     """
     try:
-        logger.info(f"Deleting user account for ID: {user_id}")
+        logger.info("Deleting user account for ID: %s", user_id)
         
         # Delete user
         result = await database.delete_user(user_id)
@@ -367,19 +393,16 @@ async def delete_user_account(
                 detail=result.get('error', 'Failed to delete user')
             )
         
-        return JSONResponse(
-            status_code=200,
-            content={
-                "success": True,
-                "message": "User account deleted successfully"
-            }
+        return UserResponse(
+            success=True,
+            message="User account deleted successfully"
         )
         
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
     except Exception as e:
-        logger.error(f"Failed to delete user account for ID {user_id}: {e}")
+        logger.error("Failed to delete user account for ID %s: %s", user_id, e)
         raise HTTPException(
             status_code=500,
             detail=f"Internal server error: {str(e)}"
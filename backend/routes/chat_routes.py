@@ -7,22 +7,30 @@ This module handles:
 - Document search and AI responses only
 """
 
+import asyncio
+import hashlib
+import json
 import logging
+import re
 import time
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, Any, AsyncIterator, List, Optional
 
 # FastAPI imports
 from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import JSONResponse
+# orjson serializes the chat payloads (nested context lists, floats) a few
+# times faster than the stdlib encoder; alias keeps the call sites unchanged.
+from fastapi.responses import ORJSONResponse as JSONResponse
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 # Google Generative AI
 import google.generativeai as genai
 
 # Services
-from services.shared import get_pdf_processor, get_vector_store, get_quantum_search
+from services.shared import get_pdf_processor, get_vector_store, get_quantum_search, utc_timestamp
 from services.retrieval import retrieve_ranked_documents
+from services.semantic_cache import SemanticResponseCache
 # Database service removed - chat history now handled by frontend
 from services.vector_store import VectorStore
 from services.quantum_search import QuantumSearch
@@ -37,6 +45,14 @@ router = APIRouter(tags=["chat"])
 
 # PDF processor will be accessed via shared services
 
+# Semantic cache for Gemini responses: near-duplicate prompts against the
+# same context reuse the prior answer instead of paying the LLM round trip.
+_semantic_cache = SemanticResponseCache()
+
+# Bound concurrent in-flight Gemini generations so a burst of chat traffic
+# neither exhausts worker threads nor trips the API rate limit.
+_gemini_semaphore = asyncio.Semaphore(settings.GEMINI_MAX_INFLIGHT)
+
 # Configure Gemini API
 if settings.GEMINI_API_KEY:
     genai.configure(api_key=settings.GEMINI_API_KEY)
@@ -55,6 +71,7 @@ class ChatRequest(BaseModel):
     force_general: bool = Field(default=False, description="Force general conversation mode without document context")
     max_context_results: int = Field(default=3, ge=1, le=10, description="Max context documents")
     temperature: float = Field(default=0.7, ge=0.0, le=1.0, description="Response creativity")
+    stream: bool = Field(default=False, description="Stream the response as server-sent events")
 
 class ChatResponse(BaseModel):
     """Response model for chat messages."""
@@ -105,32 +122,40 @@ async def chat_message(
         
         # Use explicit chat/session scope from client. Do not perform context retrieval without scope.
         session_id = request.session_id or (str(request.chat_id) if request.chat_id is not None else None)
-        chat_id = request.chat_id or session_id or f"session_{datetime.utcnow().timestamp()}"
+        chat_id = request.chat_id or session_id or f"session_{time.time()}"
         
         # Initialize context variables
         context_sources = []
         context_text = ""
         context_used = False
+        query_embedding = None
         retrieval_time_ms = 0.0
         retrieval_method = "none"
         fallback_reason = None
         candidate_count = 0
         
-        # Search for relevant context if requested and not forcing general mode
-        if request.use_context and not request.force_general:
+        # Search for relevant context if requested and not forcing general
+        # mode. A store already observed to be empty short-circuits straight
+        # to the general path, skipping the stats probe and query embedding.
+        if (
+            request.use_context
+            and not request.force_general
+            and getattr(vector_store, "known_empty", None) is not True
+        ):
             try:
                 if not session_id:
                     logger.info("No session_id/chat_id provided; skipping context retrieval to enforce chat isolation")
                     raise ValueError("missing_session_scope")
 
-                # Check if vector store has data
-                stats = await vector_store.get_collection_stats()
+                # The stats probe and the query embedding are independent
+                # I/O; overlapping them hides one round trip per turn.
+                stats, query_embedding = await asyncio.gather(
+                    vector_store.get_collection_stats(),
+                    pdf_processor.embed_query(request.message),
+                )
                 if stats["has_data"]:
                     logger.info("Searching for relevant document context...")
-                    
-                    # Generate query embedding
-                    query_embedding = await pdf_processor.embed_query(request.message)
-                    
+
                     search_result = await retrieve_ranked_documents(
                         query_embedding=query_embedding,
                         vector_store=vector_store,
@@ -159,19 +184,18 @@ async def chat_message(
                     if results:
                         context_used = True
                         context_sources = results
-                        # Combine context from top results
-                        context_text = "\n\n".join([
-                            (
-                                f"Source: "
-                                f"{result.get('metadata', {}).get('title') or result.get('metadata', {}).get('file_name') or result.get('metadata', {}).get('filename') or 'Unknown'}\n"
-                                f"{result['document']}"
-                            )
+                        # Combine context from top results in one pass
+                        context_text = "\n\n".join(
+                            _format_context_block(result)
                             for result in results[:request.max_context_results]
-                        ])
-                        logger.info(f"Found {len(results)} relevant context sources")
-                        logger.info(f"Context text length: {len(context_text)} characters")
-                        logger.info(f"First 200 chars of context: {context_text[:200]}...")
-                        logger.info(f"Sample result structure: {results[0] if results else 'No results'}")
+                        )
+                        logger.info("Found %s relevant context sources", len(results))
+                        # Content dumps are debug-only: they walked the whole
+                        # context buffer on every successful request.
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Context text length: %s characters", len(context_text))
+                            logger.debug("First 200 chars of context: %.200s...", context_text)
+                            logger.debug("Sample result structure: %s", results[0])
                     else:
                         logger.info(
                             "No relevant context found for session-scoped retrieval (session: %s, user: %s, candidates: %s, fallback: %s)",
@@ -188,12 +212,95 @@ async def chat_message(
             except Exception as e:
                 logger.warning(f"Context search failed: {e}. Proceeding without context.")
         
-        # Generate AI response using Gemini
-        response_text = await _generate_gemini_response(
-            user_message=request.message,
-            context=context_text,
-            temperature=request.temperature
-        )
+        # Extractive short-circuit: for factual questions whose top chunk
+        # already matches with high confidence, the chunk text is the answer
+        # and the Gemini round trip is skipped entirely.
+        response_model = "gemini-2.5-flash"
+        extractive_response = _extractive_response(request.message, context_sources)
+        if extractive_response is not None:
+            response_text = extractive_response
+            response_model = "extractive"
+
+        # Check the semantic cache before calling Gemini: the embedding is
+        # already in hand from context search, so a hit costs one matrix
+        # product instead of an LLM round trip.
+        response_cached = False
+        context_fingerprint = None
+        if query_embedding is not None and extractive_response is None:
+            context_fingerprint = hashlib.sha256(context_text.encode()).hexdigest()
+            cached_response = _semantic_cache.lookup(
+                query_embedding=query_embedding,
+                context_fingerprint=context_fingerprint,
+                temperature=request.temperature,
+            )
+            if cached_response is not None:
+                response_cached = True
+                response_text = cached_response
+
+        # Stream over SSE when requested: the first tokens reach the client
+        # as soon as Gemini emits them instead of after full generation.
+        if request.stream:
+            async def event_stream() -> AsyncIterator[str]:
+                full_text_parts: List[str] = []
+                try:
+                    if response_cached or extractive_response is not None:
+                        full_text_parts.append(response_text)
+                        yield _sse_frame({"delta": response_text})
+                    else:
+                        async for delta in _stream_gemini_response(
+                            user_message=request.message,
+                            context=context_text,
+                            temperature=request.temperature,
+                        ):
+                            full_text_parts.append(delta)
+                            yield _sse_frame({"delta": delta})
+                        # Only cache completed, non-empty generations; a
+                        # failed stream raises past this put, and an empty
+                        # one (e.g. a blocked response) must not be replayed.
+                        if context_fingerprint is not None and full_text_parts:
+                            _semantic_cache.put(
+                                query_embedding=query_embedding,
+                                context_fingerprint=context_fingerprint,
+                                temperature=request.temperature,
+                                response_text="".join(full_text_parts),
+                            )
+
+                    processing_time_ms = (time.perf_counter() - processing_start) * 1000
+                    yield _sse_frame({
+                        "done": True,
+                        "chat_id": chat_id,
+                        "session_id": session_id or str(chat_id),
+                        "context_used": context_used,
+                        "context_sources": context_sources,
+                        "response_cached": response_cached,
+                        "retrieval_time_ms": round(retrieval_time_ms, 2),
+                        "processing_time_ms": round(processing_time_ms, 2),
+                    })
+                except Exception as exc:
+                    logger.error(f"Chat streaming failed: {exc}")
+                    yield _sse_frame({"done": True, "error": str(exc)})
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        if not response_cached and extractive_response is None:
+            # Generate AI response using Gemini
+            generated = await _generate_gemini_response(
+                user_message=request.message,
+                context=context_text,
+                temperature=request.temperature
+            )
+            if generated is None:
+                # Transient outage: serve the apology without caching it.
+                response_text = _GEMINI_FALLBACK_TEXT
+            else:
+                response_text = generated
+                if context_fingerprint is not None:
+                    _semantic_cache.put(
+                        query_embedding=query_embedding,
+                        context_fingerprint=context_fingerprint,
+                        temperature=request.temperature,
+                        response_text=response_text,
+                    )
         
         processing_time_ms = (time.perf_counter() - processing_start) * 1000
         
@@ -210,13 +317,14 @@ async def chat_message(
             "retrieval_time_ms": round(retrieval_time_ms, 2),
             "processing_time_ms": round(processing_time_ms, 2),
             "metadata": {
-                "model": "gemini-2.5-flash",
+                "model": response_model,
                 "temperature": request.temperature,
+                "response_cached": response_cached,
                 "context_documents": len(context_sources),
                 "candidate_count": candidate_count,
                 "retrieval_method": retrieval_method,
                 "fallback_reason": fallback_reason,
-                "timestamp": datetime.now(timezone.utc).isoformat()
+                "timestamp": utc_timestamp()
             }
         }
         
@@ -236,28 +344,67 @@ async def chat_message(
             detail=f"Internal server error during chat processing: {str(e)}"
         )
 
-async def _generate_gemini_response(
-    user_message: str,
-    context: str = "",
-    temperature: float = 0.7
-) -> str:
-    """Generate response using Gemini API.
-    
+def _format_context_block(result: Dict[str, Any]) -> str:
+    """Render one retrieved chunk as a source-attributed context block."""
+    metadata = result.get('metadata', {})
+    source = (
+        metadata.get('title')
+        or metadata.get('file_name')
+        or metadata.get('filename')
+        or 'Unknown'
+    )
+    return f"Source: {source}\n{result['document']}"
+
+
+# Questions opening with an interrogative are the ones a verbatim chunk can
+# plausibly answer; opinion/instruction prompts still go to the model.
+_FACTUAL_QUESTION_RE = re.compile(r"^(what|who|when|where|which)\b", re.IGNORECASE)
+
+
+def _extractive_response(
+    message: str,
+    results: List[Dict[str, Any]],
+) -> Optional[str]:
+    """Answer a factual question straight from the top chunk when possible.
+
+    When the best retrieved chunk matches the query above the extractive
+    threshold (raw cosine, not the quantum-boosted score), the chunk text
+    almost always contains the literal answer, so it is returned with its
+    source attribution instead of spending an LLM call on rephrasing.
+
     Args:
-        user_message: User's message
-        context: Relevant document context
-        temperature: Response creativity level
-        
+        message: The user's question
+        results: Ranked context results from retrieval
+
     Returns:
-        str: Generated response
+        str: Templated extractive answer, or None to fall through to Gemini
     """
-    try:
-        # Initialize Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Prepare prompt with context
-        if context:
-            prompt = f"""You are QubitChat AI, an intelligent and friendly assistant. You can help with both document-based questions and general conversations.
+    if not results or not _FACTUAL_QUESTION_RE.match(message.strip()):
+        return None
+
+    top = results[0]
+    top_similarity = top.get("classical_similarity", top.get("similarity_score", 0.0))
+    if top_similarity < settings.EXTRACTIVE_THRESHOLD:
+        return None
+
+    metadata = top.get("metadata", {})
+    source = (
+        metadata.get("title")
+        or metadata.get("file_name")
+        or metadata.get("filename")
+        or "the uploaded document"
+    )
+    return f"According to {source}: {top['document']}"
+
+
+def _sse_frame(payload: Dict[str, Any]) -> str:
+    """Format a payload as a single server-sent-events data frame."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+# Prompt templates are rendered with a single format_map substitution per
+# request instead of rebuilding the multi-line literals each call.
+_CONTEXT_PROMPT_TEMPLATE = """You are QubitChat AI, an intelligent and friendly assistant. You can help with both document-based questions and general conversations.
 
 I have found some relevant information from uploaded documents:
 
@@ -271,30 +418,126 @@ Instructions:
 2. If the user's question is general (like greetings, general knowledge, casual conversation), respond naturally without forcing document references.
 3. If the question is partially related to documents, combine both document insights and general knowledge as appropriate.
 4. Always be helpful, conversational, and engaging."""
-        else:
-            prompt = f"""You are QubitChat AI, an intelligent and friendly assistant. You can help with general questions, casual conversation, and various topics.
+
+_GENERAL_PROMPT_TEMPLATE = """You are QubitChat AI, an intelligent and friendly assistant. You can help with general questions, casual conversation, and various topics.
 
 User question: {user_message}
 
 Please provide a helpful, engaging response. Feel free to have natural conversations on any topic. If the user wants document-specific help, let them know they can upload documents for more targeted assistance."""
-        
-        # Generate response
-        response = model.generate_content(
+
+
+@lru_cache(maxsize=1)
+def _get_gemini_model() -> "genai.GenerativeModel":
+    """Return the shared Gemini model handle (SDK setup is nontrivial)."""
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+
+def _build_prompt(user_message: str, context: str = "") -> str:
+    """Build the Gemini prompt, with or without document context."""
+    if context:
+        return _CONTEXT_PROMPT_TEMPLATE.format_map(
+            {"context": context, "user_message": user_message}
+        )
+    return _GENERAL_PROMPT_TEMPLATE.format_map({"user_message": user_message})
+
+
+@lru_cache(maxsize=128)
+def _build_generation_config(temperature: float) -> "genai.types.GenerationConfig":
+    """Return the shared Gemini generation config for a temperature.
+
+    Only temperature varies between requests, so bucketing it to two
+    decimals keeps the cache tiny while reusing one config object per
+    distinct setting instead of rebuilding it on every call.
+    """
+    return genai.types.GenerationConfig(
+        temperature=round(temperature, 2),
+        max_output_tokens=4000,
+        top_p=0.8,
+        top_k=40
+    )
+
+
+async def _stream_gemini_response(
+    user_message: str,
+    context: str = "",
+    temperature: float = 0.7
+) -> AsyncIterator[str]:
+    """Yield Gemini response text incrementally via the streaming API.
+
+    Args:
+        user_message: User's message
+        context: Relevant document context
+        temperature: Response creativity level
+
+    Yields:
+        str: Text deltas as Gemini produces them
+    """
+    model = _get_gemini_model()
+    prompt = _build_prompt(user_message, context)
+
+    # The SDK iterator blocks on the network, so both the initial call and
+    # each chunk fetch are pushed off the event loop. The semaphore is held
+    # for the whole generation since Gemini is producing tokens throughout.
+    async with _gemini_semaphore:
+        stream = await asyncio.to_thread(
+            model.generate_content,
             prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                max_output_tokens=4000,
-                top_p=0.8,
-                top_k=40
-            )
+            generation_config=_build_generation_config(temperature),
+            stream=True,
         )
-        
+        iterator = iter(stream)
+        sentinel = object()
+        while True:
+            chunk = await asyncio.to_thread(next, iterator, sentinel)
+            if chunk is sentinel:
+                break
+            text = getattr(chunk, "text", "")
+            if text:
+                yield text
+
+
+# Served when Gemini fails. Deliberately never written to the semantic
+# cache: a cached apology would be replayed for every similar query until
+# the TTL lapses, long after the outage has passed.
+_GEMINI_FALLBACK_TEXT = (
+    "I apologize, but I'm having trouble generating a response right now. "
+    "Please try again later."
+)
+
+
+async def _generate_gemini_response(
+    user_message: str,
+    context: str = "",
+    temperature: float = 0.7
+) -> Optional[str]:
+    """Generate response using Gemini API.
+
+    Args:
+        user_message: User's message
+        context: Relevant document context
+        temperature: Response creativity level
+
+    Returns:
+        str: Generated response, or None when the Gemini call fails so
+            callers can tell a real answer from an outage
+    """
+    try:
+        model = _get_gemini_model()
+
+        # The SDK call is synchronous; run it off the event loop and bound
+        # concurrent generations with the shared semaphore.
+        async with _gemini_semaphore:
+            response = await asyncio.to_thread(
+                model.generate_content,
+                _build_prompt(user_message, context),
+                generation_config=_build_generation_config(temperature)
+            )
+
         return response.text
-        
+
     except Exception as e:
         logger.error(f"Gemini API call failed: {e}")
-        # Fallback response
-        return "I apologize, but I'm having trouble generating a response right now. Please try again later."
+        return None
 
 # Export router
 __all__ = ["router"]
@@ -8,15 +8,22 @@ This module handles:
 - Error handling and response formatting
 """
 
+import asyncio
+import hashlib
 import os
 import tempfile
 import logging
-from typing import Dict, Any
+import uuid
+
+import aiofiles
+from typing import Any, Dict, List, Tuple
 from datetime import datetime
 
 # FastAPI imports
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, BackgroundTasks
-from fastapi.responses import JSONResponse
+# orjson handles the processing-stat payloads faster than the stdlib
+# encoder; alias keeps the call sites unchanged.
+from fastapi.responses import ORJSONResponse as JSONResponse
 from typing import Optional
 
 # Services
@@ -34,16 +41,87 @@ router = APIRouter(tags=["pdf"])
 # Get shared service instances
 pdf_processor = get_pdf_processor()
 
+# In-process upload job queue: accepted files are processed by a small pool
+# of worker tasks so queued uploads don't hold an HTTP connection open for
+# the whole embedding pipeline.
+_upload_jobs: Dict[str, Dict[str, Any]] = {}
+_upload_queue: Optional[asyncio.Queue] = None
+_upload_workers: List[asyncio.Task] = []
+
+# Completed/failed job records kept for status polling before pruning.
+UPLOAD_JOB_HISTORY_LIMIT = 1000
+
+
+def _ensure_upload_workers() -> asyncio.Queue:
+    """Create the job queue and worker pool on first use."""
+    global _upload_queue
+    if _upload_queue is None:
+        _upload_queue = asyncio.Queue()
+        for _ in range(settings.PDF_WORKER_CONCURRENCY):
+            _upload_workers.append(asyncio.create_task(_upload_worker(_upload_queue)))
+        logger.info(
+            "Started %s PDF upload workers", settings.PDF_WORKER_CONCURRENCY
+        )
+    return _upload_queue
+
+
+def _prune_upload_jobs() -> None:
+    """Drop the oldest finished job records beyond the history limit."""
+    if len(_upload_jobs) <= UPLOAD_JOB_HISTORY_LIMIT:
+        return
+    for job_id in [
+        job_id
+        for job_id, job in _upload_jobs.items()
+        if job["status"] in ("completed", "failed")
+    ][: len(_upload_jobs) - UPLOAD_JOB_HISTORY_LIMIT]:
+        _upload_jobs.pop(job_id, None)
+
+
+async def _upload_worker(queue: asyncio.Queue) -> None:
+    """Pull queued uploads and run the processing pipeline for each."""
+    while True:
+        job_id, temp_file_path, filename, session_id, user_id, file_hash = await queue.get()
+        job = _upload_jobs.get(job_id)
+        if job is not None:
+            job["status"] = "processing"
+        try:
+            result = await _process_pdf_background(
+                temp_file_path,
+                filename,
+                get_vector_store(),
+                session_id=session_id,
+                user_id=user_id,
+                file_hash=file_hash,
+            )
+            if job is not None:
+                if result["success"]:
+                    job["status"] = "completed"
+                    job["chunks_created"] = result["chunks_count"]
+                    job["file_hash"] = result["file_metadata"].get("file_hash")
+                else:
+                    job["status"] = "failed"
+                    job["error"] = result.get("error", "Unknown error")
+        except Exception as exc:
+            logger.error(f"Upload worker failed for job {job_id}: {exc}")
+            if job is not None:
+                job["status"] = "failed"
+                job["error"] = str(exc)
+        finally:
+            await _cleanup_temp_file(temp_file_path)
+            _prune_upload_jobs()
+            queue.task_done()
+
 @router.post("/upload_pdf")
 async def upload_pdf(
     background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     session_id: Optional[str] = Form(None),
     user_id: Optional[str] = Form(None),
+    wait: bool = True,
     vector_store: VectorStore = Depends(get_vector_store)
 ) -> JSONResponse:
     """Upload and process a PDF file with session tracking.
-    
+
     This endpoint:
     1. Validates the uploaded PDF file
     2. Saves it temporarily
@@ -51,16 +129,21 @@ async def upload_pdf(
     4. Generates embeddings
     5. Stores embeddings in ChromaDB with session_id metadata
     6. Returns processing results
-    
+
+    With ?wait=false the upload is accepted with 202 and a job_id after
+    step 2, and steps 3-5 run on the in-process worker pool; progress is
+    available from GET /upload_pdf/{job_id}.
+
     Args:
         background_tasks: FastAPI background tasks
         file: Uploaded PDF file
         session_id: Optional chat session ID to associate with this PDF
         user_id: Optional user ID
+        wait: Process synchronously (default) or enqueue and return 202
         vector_store: ChromaDB vector store instance
-        
+
     Returns:
-        JSONResponse: Processing results and metadata
+        JSONResponse: Processing results, or job details when queued
     """
     temp_file_path = None
     
@@ -75,16 +158,42 @@ async def upload_pdf(
                 detail=validation_result["error"]
             )
         
-        # Save uploaded file temporarily
-        temp_file_path = await _save_temp_file(file)
-        
+        # Save uploaded file temporarily (streamed; hash computed inline)
+        temp_file_path, file_hash, _ = await _save_temp_file(file)
+
+        # Queued mode: hand the accepted file to the worker pool and return
+        # immediately instead of holding the connection open.
+        if not wait:
+            job_id = str(uuid.uuid4())
+            _upload_jobs[job_id] = {
+                "job_id": job_id,
+                "status": "queued",
+                "file_name": file.filename,
+                "created_at": datetime.utcnow().isoformat(),
+            }
+            _ensure_upload_workers().put_nowait(
+                (job_id, temp_file_path, file.filename, session_id, user_id, file_hash)
+            )
+            temp_file_path = None  # Worker owns cleanup from here
+            logger.info(f"Queued PDF upload job {job_id}: {file.filename}")
+            return JSONResponse(
+                status_code=202,
+                content={
+                    "success": True,
+                    "job_id": job_id,
+                    "status": "queued",
+                    "file_name": file.filename,
+                }
+            )
+
         # Process PDF in background for better performance
         processing_task = _process_pdf_background(
-            temp_file_path, 
-            file.filename, 
+            temp_file_path,
+            file.filename,
             vector_store,
             session_id=session_id,
-            user_id=user_id
+            user_id=user_id,
+            file_hash=file_hash
         )
         
         # For now, process synchronously to return results immediately
@@ -141,6 +250,27 @@ async def upload_pdf(
             detail=f"Internal server error during PDF processing: {str(e)}"
         )
 
+@router.get("/upload_pdf/{job_id}")
+async def get_upload_job_status(job_id: str) -> JSONResponse:
+    """Get the status of a queued PDF upload job.
+
+    Args:
+        job_id: Job ID returned by a ?wait=false upload
+
+    Returns:
+        JSONResponse: Current job state
+    """
+    job = _upload_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Upload job not found"
+        )
+    return JSONResponse(
+        status_code=200,
+        content=job
+    )
+
 @router.get("/pdf_stats")
 async def get_pdf_stats(
     vector_store: VectorStore = Depends(get_vector_store)
@@ -273,62 +403,213 @@ async def _validate_pdf_file(file: UploadFile) -> Dict[str, Any]:
             "error": f"File validation failed: {str(e)}"
         }
 
-async def _save_temp_file(file: UploadFile) -> str:
-    """Save uploaded file to temporary location.
-    
+# Upload copy granularity: 1 MB keeps peak memory flat regardless of PDF size.
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+async def _save_temp_file(file: UploadFile) -> Tuple[str, str, int]:
+    """Stream the upload to a temporary file, hashing and sizing it inline.
+
+    The upload is copied in fixed-size chunks so a large PDF never sits
+    fully in process memory, the SHA-256 needed for deduplication is
+    computed during the same pass, and the size limit is enforced as bytes
+    arrive instead of after the whole payload has been read.
+
     Args:
         file: Uploaded file to save
-        
+
     Returns:
-        str: Path to temporary file
+        Tuple of (temporary file path, SHA-256 hex digest, total bytes)
     """
+    temp_fd, temp_path = tempfile.mkstemp(suffix='.pdf', prefix='upload_')
+    os.close(temp_fd)
+    hasher = hashlib.sha256()
+    total_size = 0
+
     try:
-        # Create temporary file
-        temp_fd, temp_path = tempfile.mkstemp(suffix='.pdf', prefix='upload_')
-        
-        # Write file content
-        with os.fdopen(temp_fd, 'wb') as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-        
-        # Reset file position for potential re-reading
-        await file.seek(0)
-        
-        logger.info(f"Saved temporary file: {temp_path}")
-        return temp_path
-        
+        # aiofiles keeps the event loop free during disk writes, so other
+        # requests keep progressing while a large PDF lands on disk.
+        async with aiofiles.open(temp_path, 'wb') as temp_file:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if total_size == 0 and not chunk.startswith(b'%PDF-'):
+                    # Magic-number check on the first chunk: unlike the
+                    # client-supplied content type, the header can't lie.
+                    raise HTTPException(
+                        status_code=400,
+                        detail="File content is not a valid PDF"
+                    )
+                total_size += len(chunk)
+                if total_size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File size exceeds maximum limit of {settings.MAX_FILE_SIZE // (1024 * 1024)}MB"
+                    )
+                hasher.update(chunk)
+                await temp_file.write(chunk)
+
+        logger.info(f"Saved temporary file: {temp_path} ({total_size} bytes)")
+        return temp_path, hasher.hexdigest(), total_size
+
     except Exception as e:
-        logger.error(f"Failed to save temporary file: {e}")
+        # Remove the partial file on any failure, including oversize aborts.
+        if os.path.exists(temp_path):
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+        if not isinstance(e, HTTPException):
+            logger.error(f"Failed to save temporary file: {e}")
         raise
 
-async def _process_pdf_background(
-    file_path: str, 
-    filename: str, 
+async def _reuse_existing_chunks(
     vector_store: VectorStore,
+    file_hash: str,
+    filename: str,
     session_id: Optional[str] = None,
     user_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Serve a repeat upload from chunks already stored for the same bytes.
+
+    The SHA-256 hash identifies the file content exactly, so a previously
+    ingested copy already holds the chunk texts and embeddings this upload
+    would produce. When the hash is found, the extraction and embedding
+    pipeline is skipped: either the session already has the chunks (nothing
+    to do) or the stored vectors are copied into the new session scope.
+
+    Args:
+        vector_store: Vector store instance
+        file_hash: SHA-256 of the uploaded file
+        filename: Original filename of this upload
+        session_id: Optional chat session ID
+        user_id: Optional user ID
+
+    Returns:
+        dict: Processing result when the hash was already ingested,
+            or None when the file must go through the full pipeline
+    """
+    existing = await vector_store.get_all_embeddings(
+        metadata={"file_hash": file_hash}
+    )
+    if not existing:
+        return None
+
+    now_iso = datetime.utcnow().isoformat()
+
+    def _result_from(chunks: List[Dict[str, Any]], embedded: List[Dict[str, Any]]) -> Dict[str, Any]:
+        source_metadata = chunks[0].get("metadata", {})
+        return {
+            "success": True,
+            "deduplicated": True,
+            "file_metadata": {
+                "file_name": filename,
+                "file_hash": file_hash,
+                "file_size": source_metadata.get("file_size", 0),
+                "num_pages": source_metadata.get("num_pages", 0),
+                "title": source_metadata.get("title", ""),
+                "author": source_metadata.get("author", ""),
+                "processed_at": now_iso,
+            },
+            "chunks_count": len(chunks),
+            "embedded_chunks": embedded,
+            "processing_time": now_iso,
+        }
+
+    # Same file re-uploaded into the same session: the chunks are already
+    # retrievable there, so there is nothing to store.
+    if session_id is not None:
+        session_chunks = [
+            chunk
+            for chunk in existing
+            if chunk.get("metadata", {}).get("session_id") == str(session_id)
+        ]
+        if session_chunks:
+            logger.info(
+                "Duplicate upload of %s (hash %s) in session %s; reusing %s stored chunks",
+                filename,
+                file_hash,
+                session_id,
+                len(session_chunks),
+            )
+            return _result_from(session_chunks, [])
+
+    # Same file in a different session: copy one stored chunk set into the
+    # new scope so session isolation is preserved without re-embedding.
+    by_scope: Dict[Any, List[Dict[str, Any]]] = {}
+    for chunk in existing:
+        scope = chunk.get("metadata", {}).get("session_id")
+        by_scope.setdefault(scope, []).append(chunk)
+    canonical = sorted(
+        next(iter(by_scope.values())),
+        key=lambda chunk: int(chunk.get("metadata", {}).get("chunk_id", 0) or 0),
+    )
+
+    embedded_chunks = []
+    for i, chunk in enumerate(canonical):
+        metadata = dict(chunk.get("metadata", {}))
+        metadata.pop("session_id", None)
+        metadata.pop("user_id", None)
+        metadata["processed_at"] = now_iso
+        unique_id = f"{file_hash}_{filename}_{now_iso}_{i}".replace(' ', '_').replace(':', '-')
+        embedded_chunks.append({
+            "id": unique_id,
+            "text": chunk.get("document", chunk.get("text", "")),
+            "embedding": chunk["embedding"],
+            "metadata": metadata,
+        })
+
+    logger.info(
+        "Reusing %s stored chunks for %s (hash %s); embedding pipeline skipped",
+        len(embedded_chunks),
+        filename,
+        file_hash,
+    )
+    return _result_from(canonical, embedded_chunks)
+
+async def _process_pdf_background(
+    file_path: str,
+    filename: str,
+    vector_store: VectorStore,
+    session_id: Optional[str] = None,
+    user_id: Optional[str] = None,
+    file_hash: Optional[str] = None
 ) -> Dict[str, Any]:
     """Process PDF file and store embeddings with session metadata (background task).
-    
+
     Args:
         file_path: Path to the PDF file
         filename: Original filename
         vector_store: Vector store instance
         session_id: Optional chat session ID
         user_id: Optional user ID
-        
+        file_hash: Precomputed SHA-256 of the file, if already known
+
     Returns:
         dict: Processing result
     """
     try:
         logger.info(f"Starting background PDF processing: {filename} (session: {session_id})")
-        
-        # Process PDF through the pipeline
-        processing_result = await pdf_processor.process_pdf(file_path)
-        
+
+        # Dedupe by content hash before running the (expensive) pipeline.
+        processing_result = None
+        if file_hash:
+            processing_result = await _reuse_existing_chunks(
+                vector_store,
+                file_hash,
+                filename,
+                session_id=session_id,
+                user_id=user_id,
+            )
+            if processing_result is not None and not processing_result["embedded_chunks"]:
+                # Chunks already stored for this session; nothing to write.
+                return processing_result
+
+        if processing_result is None:
+            # Process PDF through the pipeline
+            processing_result = await pdf_processor.process_pdf(file_path, file_hash=file_hash)
+
         if not processing_result["success"]:
             return processing_result
-        
+
         # Ensure source metadata (original filename/title) is persisted with each vector.
         for chunk in processing_result["embedded_chunks"]:
             chunk_metadata = chunk.get("metadata", {})
@@ -379,15 +660,16 @@ async def _process_pdf_background(
             "error": str(e)
         }
 
-def _cleanup_temp_file(file_path: str):
+async def _cleanup_temp_file(file_path: str):
     """Clean up temporary file (background task).
-    
+
     Args:
         file_path: Path to temporary file to delete
     """
     try:
         if os.path.exists(file_path):
-            os.unlink(file_path)
+            # unlink blocks on the filesystem; keep it off the event loop.
+            await asyncio.to_thread(os.unlink, file_path)
             logger.info(f"Cleaned up temporary file: {file_path}")
     except Exception as e:
         logger.error(f"Failed to cleanup temporary file {file_path}: {e}")
@@ -9,16 +9,21 @@ This module handles:
 
 import logging
 import time
-from typing import Dict, Any, List, Optional
-from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
 
 # FastAPI imports
 from fastapi import APIRouter, HTTPException, Depends, Query
-from fastapi.responses import JSONResponse
+# orjson serializes the result payloads (lists of floats and metadata
+# dicts) several times faster than the stdlib encoder; alias keeps the
+# call sites unchanged.
+from fastapi.responses import ORJSONResponse as JSONResponse
 from pydantic import BaseModel, Field
 
 # Services
-from services.shared import get_pdf_processor, get_vector_store, get_quantum_search
+from services.shared import get_pdf_processor, get_vector_store, get_quantum_search, utc_timestamp
 from services.retrieval import retrieve_ranked_documents
 from services.vector_store import VectorStore
 from services.quantum_search import QuantumSearch
@@ -33,6 +38,44 @@ router = APIRouter(tags=["query"])
 
 # PDF processor will be accessed via shared services
 
+# Query embeddings repeat heavily (the same questions get re-asked), and the
+# encoder forward pass dominates request latency. This in-process LRU sits in
+# front of the persistent SQLite cache in PDFProcessor.embed_query: a hit
+# costs one dict lookup instead of a thread hop plus a database read. Keys
+# are (model, whitespace/case-normalized text) so trivially reworded repeats
+# also hit and a model change cannot serve stale vectors.
+_EMBED_CACHE_MAX_ENTRIES = 2048
+_query_embedding_cache: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+
+
+def _normalize_query_text(query: str) -> str:
+    """Collapse whitespace and case so trivial rephrasings share a cache key."""
+    return " ".join(query.lower().split())
+
+
+
+async def _embed_query_cached(pdf_processor, query: str) -> np.ndarray:
+    """Embed a query, serving repeats from the in-process LRU.
+
+    Args:
+        pdf_processor: PDF processor providing the embedding model
+        query: Raw query text
+
+    Returns:
+        np.ndarray: Query embedding vector (float32)
+    """
+    key = (pdf_processor.embedding_config["model"], _normalize_query_text(query))
+    cached = _query_embedding_cache.get(key)
+    if cached is not None:
+        _query_embedding_cache.move_to_end(key)
+        return cached
+
+    embedding = await pdf_processor.embed_query(query)
+    _query_embedding_cache[key] = embedding
+    while len(_query_embedding_cache) > _EMBED_CACHE_MAX_ENTRIES:
+        _query_embedding_cache.popitem(last=False)
+    return embedding
+
 # Pydantic models for request/response
 class QueryRequest(BaseModel):
     """Request model for search queries."""
@@ -92,9 +135,9 @@ async def search_query(
                 }
             )
         
-        # Generate query embedding
+        # Generate query embedding (repeat queries hit the in-process LRU)
         logger.info("Generating query embedding...")
-        query_embedding = await pdf_processor.embed_query(request.query)
+        query_embedding = await _embed_query_cached(pdf_processor, request.query)
 
         search_result = await retrieve_ranked_documents(
             query_embedding=query_embedding,
@@ -129,7 +172,7 @@ async def search_query(
                 "fallback_reason": search_result.get("fallback_reason"),
                 "candidate_count": search_result.get("candidate_count", 0),
                 "embedding_model": pdf_processor.embedding_config["model"],
-                "search_timestamp": datetime.now(timezone.utc).isoformat()
+                "search_timestamp": utc_timestamp()
             }
         }
         
@@ -227,16 +270,9 @@ async def find_similar_documents(
     try:
         logger.info(f"Finding documents similar to: {document_id}")
         
-        # Get all embeddings to find the reference document
-        all_embeddings = await vector_store.get_all_embeddings()
-        
-        # Find the reference document
-        reference_doc = None
-        for doc in all_embeddings:
-            if doc["id"] == document_id:
-                reference_doc = doc
-                break
-        
+        # Point lookup instead of scanning every embedding for one id
+        reference_doc = await vector_store.get_by_id(document_id)
+
         if not reference_doc:
             raise HTTPException(
                 status_code=404,
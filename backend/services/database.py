@@ -8,8 +8,11 @@ This module handles:
 Note: Chat history operations have been moved to frontend local storage.
 """
 
+import asyncio
 import logging
 import os
+import time
+from collections import OrderedDict
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 from fastapi import HTTPException
@@ -21,6 +24,10 @@ logger = logging.getLogger(__name__)
 
 SUPABASE_PROXY_MISMATCH = "unexpected keyword argument 'proxy'"
 
+# In-process TTL cache bounds for user-by-email reads on the login hot path.
+USER_CACHE_TTL_SECONDS = 30
+USER_CACHE_MAX_ENTRIES = 10_000
+
 
 def _is_supabase_dependency_mismatch(exc: Exception) -> bool:
     """Detect known Supabase/httpx incompatibility seen in container builds."""
@@ -34,6 +41,36 @@ class DatabaseService:
         """Initialize the database service."""
         self.client: Optional[Client] = None
         self._initialized = False
+        # email (lowercased) -> (expiry, user row); LRU order via OrderedDict
+        self._user_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def _cache_user(self, email: str, user: Dict[str, Any]) -> None:
+        """Cache a user row keyed by lowercased email with a short TTL."""
+        key = email.lower()
+        self._user_cache[key] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+        self._user_cache.move_to_end(key)
+        while len(self._user_cache) > USER_CACHE_MAX_ENTRIES:
+            self._user_cache.popitem(last=False)
+
+    def _get_cached_user(self, email: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached user row for the email, if any."""
+        key = email.lower()
+        entry = self._user_cache.get(key)
+        if entry is None:
+            return None
+        expiry, user = entry
+        if time.monotonic() >= expiry:
+            self._user_cache.pop(key, None)
+            return None
+        self._user_cache.move_to_end(key)
+        return dict(user)
+
+    def _invalidate_user_cache(self, email: Optional[str] = None) -> None:
+        """Drop a cached email entry, or the whole cache when email is unknown."""
+        if email is None:
+            self._user_cache.clear()
+        else:
+            self._user_cache.pop(email.lower(), None)
     
     async def initialize(self) -> None:
         """Initialize Supabase client."""
@@ -104,15 +141,18 @@ class DatabaseService:
         self._ensure_initialized()
         
         try:
-            result = self.client.table('signup_users').insert({
+            # The PostgREST call is synchronous; run it off the event loop.
+            query = self.client.table('signup_users').insert({
                 'full_name': full_name,
                 'email': email,
                 'password': password,
                 'phone_number': phone_number
-            }).execute()
+            })
+            result = await asyncio.to_thread(query.execute)
             
             if result.data:
                 logger.info(f"User created successfully: {email}")
+                self._invalidate_user_cache(email)
                 return {'success': True, 'user': result.data[0]}
             else:
                 logger.error(f"Failed to create user: {email}")
@@ -122,6 +162,87 @@ class DatabaseService:
             logger.error(f"Error creating user {email}: {e}")
             return {'success': False, 'error': str(e)}
     
+    async def create_user_if_absent(self, full_name: str, email: str, password: str, phone_number: Optional[str] = None) -> Dict[str, Any]:
+        """Create a user unless the email is already registered, in one round trip.
+
+        Uses PostgREST's upsert with ignore_duplicates so the duplicate check
+        and the insert happen atomically server-side, avoiding the separate
+        SELECT and its TOCTOU race. The ON CONFLICT target needs the unique
+        index from sql/signup_users_email_index.sql; until an operator applies
+        it, Postgres rejects the upsert, so that specific failure falls back
+        to the legacy exists-check + insert path instead of breaking signup.
+
+        Args:
+            full_name: User's full name
+            email: User's email address
+            password: User's password (should be hashed)
+            phone_number: Optional phone number
+
+        Returns:
+            Dict containing user data, a duplicate flag, or an error
+        """
+        self._ensure_initialized()
+
+        try:
+            query = self.client.table('signup_users').upsert(
+                {
+                    'full_name': full_name,
+                    'email': email,
+                    'password': password,
+                    'phone_number': phone_number
+                },
+                on_conflict='email',
+                ignore_duplicates=True,
+            )
+            result = await asyncio.to_thread(query.execute)
+
+            if result.data:
+                logger.info(f"User created successfully: {email}")
+                self._invalidate_user_cache(email)
+                return {'success': True, 'user': result.data[0]}
+
+            # No row returned means the insert was skipped for an existing email.
+            return {'success': False, 'duplicate': True}
+
+        except Exception as e:
+            if self._is_missing_conflict_target_error(e):
+                logger.warning(
+                    "Upsert on signup_users.email rejected (unique index from "
+                    "sql/signup_users_email_index.sql not applied?); falling "
+                    "back to exists-check + insert."
+                )
+                return await self._create_user_if_absent_fallback(
+                    full_name, email, password, phone_number
+                )
+            logger.error(f"Error creating user {email}: {e}")
+            return {'success': False, 'error': str(e)}
+
+    @staticmethod
+    def _is_missing_conflict_target_error(error: Exception) -> bool:
+        """Check whether an upsert failed because its ON CONFLICT target is missing.
+
+        Postgres reports this as error 42P10 ("there is no unique or exclusion
+        constraint matching the ON CONFLICT specification"); PostgREST client
+        exceptions surface the code and/or message text.
+        """
+        text = str(error)
+        code = getattr(error, 'code', None)
+        return code == '42P10' or '42P10' in text or (
+            'ON CONFLICT' in text and 'constraint' in text
+        )
+
+    async def _create_user_if_absent_fallback(self, full_name: str, email: str, password: str, phone_number: Optional[str] = None) -> Dict[str, Any]:
+        """Legacy two-step duplicate check used when the upsert path is unavailable.
+
+        Reintroduces the SELECT-then-INSERT race, but only runs on deployments
+        that have not applied the email unique index yet.
+        """
+        existing_user = await self.get_user_by_email(email)
+        if existing_user is not None:
+            return {'success': False, 'duplicate': True}
+
+        return await self.create_user(full_name, email, password, phone_number)
+
     async def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Get user by email address.
         
@@ -132,11 +253,21 @@ class DatabaseService:
             User data if found, None otherwise
         """
         self._ensure_initialized()
-        
+
+        cached_user = self._get_cached_user(email)
+        if cached_user is not None:
+            return cached_user
+
         try:
-            result = self.client.table('signup_users').select('*').eq('email', email).execute()
-            
+            # Explicit column list: login verification needs the password
+            # hash, but future columns should not silently widen this row.
+            query = self.client.table('signup_users').select(
+                'id,full_name,email,phone_number,password,created_at'
+            ).eq('email', email)
+            result = await asyncio.to_thread(query.execute)
+
             if result.data:
+                self._cache_user(email, result.data[0])
                 return result.data[0]
             return None
             
@@ -156,7 +287,11 @@ class DatabaseService:
         self._ensure_initialized()
         
         try:
-            result = self.client.table('signup_users').select('*').eq('id', user_id).execute()
+            # Profile reads never need the password hash; don't fetch it.
+            query = self.client.table('signup_users').select(
+                'id,full_name,email,phone_number,created_at'
+            ).eq('id', user_id)
+            result = await asyncio.to_thread(query.execute)
             
             if result.data:
                 return result.data[0]
@@ -194,10 +329,13 @@ class DatabaseService:
             if not update_data:
                 return {'success': False, 'error': 'No data to update'}
             
-            result = self.client.table('signup_users').update(update_data).eq('id', user_id).execute()
+            query = self.client.table('signup_users').update(update_data).eq('id', user_id)
+            result = await asyncio.to_thread(query.execute)
             
             if result.data:
                 logger.info(f"User updated successfully: {user_id}")
+                # Email may have changed, so drop the whole cache.
+                self._invalidate_user_cache()
                 return {'success': True, 'user': result.data[0]}
             else:
                 logger.error(f"Failed to update user: {user_id}")
@@ -207,6 +345,36 @@ class DatabaseService:
             logger.error(f"Error updating user {user_id}: {e}")
             return {'success': False, 'error': str(e)}
     
+    async def update_user_password(self, user_id: int, hashed_password: str) -> Dict[str, Any]:
+        """Update a user's stored password hash.
+
+        Args:
+            user_id: User's ID
+            hashed_password: New password hash to store
+
+        Returns:
+            Dict containing success status or error
+        """
+        self._ensure_initialized()
+
+        try:
+            query = self.client.table('signup_users').update(
+                {'password': hashed_password}
+            ).eq('id', user_id)
+            result = await asyncio.to_thread(query.execute)
+
+            if result.data:
+                logger.info(f"Password hash updated for user: {user_id}")
+                self._invalidate_user_cache()
+                return {'success': True}
+            else:
+                logger.error(f"Failed to update password for user: {user_id}")
+                return {'success': False, 'error': 'Failed to update password'}
+
+        except Exception as e:
+            logger.error(f"Error updating password for user {user_id}: {e}")
+            return {'success': False, 'error': str(e)}
+
     async def delete_user(self, user_id: int) -> Dict[str, Any]:
         """Delete a user account.
         
@@ -219,10 +387,12 @@ class DatabaseService:
         self._ensure_initialized()
         
         try:
-            result = self.client.table('signup_users').delete().eq('id', user_id).execute()
+            query = self.client.table('signup_users').delete().eq('id', user_id)
+            result = await asyncio.to_thread(query.execute)
             
             if result.data:
                 logger.info(f"User deleted successfully: {user_id}")
+                self._invalidate_user_cache()
                 return {'success': True, 'message': 'User deleted successfully'}
             else:
                 logger.error(f"Failed to delete user: {user_id}")
@@ -249,37 +419,45 @@ _database_service: Optional[DatabaseService] = None
 
 async def get_database_service() -> DatabaseService:
     """Get or create the global database service instance.
-    
+
+    The hot path is a plain attribute check and return; the one-time
+    creation/validation work lives in _create_database_service.
+
     Returns:
         DatabaseService instance
     """
+    if _database_service is not None:
+        return _database_service
+    return await _create_database_service()
+
+async def _create_database_service() -> DatabaseService:
+    """Create and initialize the singleton, translating failures to HTTP 503."""
     global _database_service
-    
-    if _database_service is None:
-        _database_service = DatabaseService()
-        try:
-            await _database_service.initialize()
-        except RuntimeError as exc:
-            logger.exception("Database service initialization failed: %s", exc)
-            _database_service = None
-            raise HTTPException(
-                status_code=503,
-                detail=str(exc),
-            )
-        except Exception as exc:
-            logger.exception("Unexpected database initialization failure: %s", exc)
-            _database_service = None
-            if _is_supabase_dependency_mismatch(exc):
-                raise HTTPException(
-                    status_code=503,
-                    detail=(
-                        "Authentication backend initialization failed: incompatible "
-                        "Supabase/httpx dependency versions in the deployed container"
-                    ),
-                )
+
+    _database_service = DatabaseService()
+    try:
+        await _database_service.initialize()
+    except RuntimeError as exc:
+        logger.exception("Database service initialization failed: %s", exc)
+        _database_service = None
+        raise HTTPException(
+            status_code=503,
+            detail=str(exc),
+        )
+    except Exception as exc:
+        logger.exception("Unexpected database initialization failure: %s", exc)
+        _database_service = None
+        if _is_supabase_dependency_mismatch(exc):
             raise HTTPException(
                 status_code=503,
-                detail="Authentication backend initialization failed: invalid Supabase configuration",
+                detail=(
+                    "Authentication backend initialization failed: incompatible "
+                    "Supabase/httpx dependency versions in the deployed container"
+                ),
             )
-    
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication backend initialization failed: invalid Supabase configuration",
+        )
+
     return _database_service
@@ -0,0 +1,200 @@
+"""Persistent embedding cache backed by SQLite.
+
+This service handles:
+- On-disk caching of query embeddings keyed by SHA-256(model + text)
+- float32 blob storage (384-d vector ~= 1.5 KB per entry)
+- LRU eviction once the entry cap is reached
+
+Repeated questions (greetings, canned prompts) skip the embedding model
+entirely on warm lookups, surviving process restarts.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# ~100k 384-d float32 entries is on the order of 150 MB on disk.
+EMBED_CACHE_MAX_ENTRIES = 100_000
+# Evict in batches so the cleanup DELETE doesn't run on every put.
+EMBED_CACHE_EVICTION_BATCH = 1_000
+
+
+def _resolve_cache_path(configured_path: str) -> Path:
+    """Resolve the cache file location, anchored at the backend root."""
+    backend_root = Path(__file__).resolve().parent.parent
+    candidate = Path(configured_path).expanduser()
+    if not candidate.is_absolute():
+        candidate = backend_root / candidate
+    candidate.parent.mkdir(parents=True, exist_ok=True)
+    return candidate
+
+
+class EmbeddingCache:
+    """SQLite-backed cache of embedding vectors keyed by content hash."""
+
+    def __init__(self, db_path: Optional[str] = None):
+        """Open (or create) the cache database.
+
+        Args:
+            db_path: Path to the SQLite cache file
+        """
+        path = _resolve_cache_path(db_path or settings.EMBED_CACHE_PATH)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_used"
+            " ON embeddings (last_used)"
+        )
+        self._connection.commit()
+        logger.info(f"EmbeddingCache initialized at: {path}")
+
+    @staticmethod
+    def _make_key(model_id: str, text: str) -> bytes:
+        """Content-addressed key: SHA-256 over model identity plus text.
+
+        Text is case-folded and whitespace-collapsed first, so trivially
+        reworded repeats of the same query share one cached vector; the
+        stored embedding of the original phrasing is interchangeable for
+        retrieval purposes.
+        """
+        normalized = " ".join(text.lower().split())
+        return hashlib.sha256((model_id + "\x00" + normalized).encode()).digest()
+
+    def get(self, model_id: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for the text, if present.
+
+        Args:
+            model_id: Embedding model identifier
+            text: Raw input text
+
+        Returns:
+            Cached embedding vector (float32), or None on a miss
+        """
+        key = self._make_key(model_id, text)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT vector FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._connection.commit()
+        # frombuffer is a zero-copy view over the blob; callers treat
+        # embeddings as read-only so the view is returned as-is.
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def get_many(
+        self, model_id: str, texts: List[str]
+    ) -> List[Optional[np.ndarray]]:
+        """Return cached embeddings for a batch of texts, position-aligned.
+
+        Args:
+            model_id: Embedding model identifier
+            texts: Raw input texts
+
+        Returns:
+            One entry per input text: the cached float32 vector, or None on
+            a miss
+        """
+        now = time.time()
+        results: List[Optional[np.ndarray]] = []
+        with self._lock:
+            for text in texts:
+                key = self._make_key(model_id, text)
+                row = self._connection.execute(
+                    "SELECT vector FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    results.append(None)
+                    continue
+                self._connection.execute(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    (now, key),
+                )
+                results.append(np.frombuffer(row[0], dtype=np.float32))
+            self._connection.commit()
+        return results
+
+    def put_many(
+        self, model_id: str, texts: List[str], embeddings: List[List[float]]
+    ) -> None:
+        """Store a batch of embeddings in one transaction."""
+        now = time.time()
+        rows = [
+            (
+                self._make_key(model_id, text),
+                np.asarray(embedding, dtype=np.float32).tobytes(),
+                now,
+            )
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used)"
+                " VALUES (?, ?, ?)",
+                rows,
+            )
+            count = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+            if count > EMBED_CACHE_MAX_ENTRIES:
+                self._connection.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?"
+                    ")",
+                    (max(count - EMBED_CACHE_MAX_ENTRIES, EMBED_CACHE_EVICTION_BATCH),),
+                )
+            self._connection.commit()
+
+    def put(self, model_id: str, text: str, embedding: List[float]) -> None:
+        """Store an embedding, evicting least-recently-used rows at capacity."""
+        key = self._make_key(model_id, text)
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used)"
+                " VALUES (?, ?, ?)",
+                (key, blob, time.time()),
+            )
+            count = self._connection.execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+            if count > EMBED_CACHE_MAX_ENTRIES:
+                self._connection.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?"
+                    ")",
+                    (EMBED_CACHE_EVICTION_BATCH,),
+                )
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the underlying SQLite connection."""
+        with self._lock:
+            self._connection.close()
+
+
+# Export main class
+__all__ = ["EmbeddingCache"]
@@ -10,10 +10,15 @@ This service handles:
 import os
 import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import math
+import mmap
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import asyncio
 
+import numpy as np
+
 # PDF processing
 import pypdf
 from pypdf import PdfReader
@@ -28,8 +33,50 @@ from langchain_community.embeddings import HuggingFaceEmbeddings
 # Configuration
 from config import settings, get_embedding_config
 
+# Persistent query-embedding cache
+from services.embedding_cache import EmbeddingCache
+
 logger = logging.getLogger(__name__)
 
+# Micro-batching window for concurrent query embeddings: requests arriving
+# within this window share one encoder forward pass.
+EMBED_MICROBATCH_WINDOW_SECONDS = 0.01
+EMBED_MICROBATCH_MAX_ITEMS = 32
+
+# Page extraction fans out across processes only past this size; below it,
+# worker startup and IPC cost more than the extraction itself.
+PDF_PARALLEL_MIN_PAGES = 8
+
+# Shared worker pool for page extraction, created on first use. pypdf's
+# extract_text is pure-Python and CPU-bound, so threads would serialize
+# behind the GIL; processes actually run pages concurrently.
+_page_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    """Return the shared page-extraction process pool."""
+    global _page_pool
+    if _page_pool is None:
+        _page_pool = ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, 4))
+    return _page_pool
+
+
+def _extract_page_range(file_path: str, start: int, stop: int) -> List[Tuple[int, str]]:
+    """Extract text for pages [start, stop); runs in a worker process.
+
+    The worker reopens the PDF by path so no reader object crosses the
+    process boundary. Pages that fail to extract yield empty strings and
+    are skipped by the caller, matching the serial path's behavior.
+    """
+    reader = PdfReader(file_path)
+    extracted = []
+    for page_num in range(start, stop):
+        try:
+            extracted.append((page_num, reader.pages[page_num].extract_text() or ""))
+        except Exception:
+            extracted.append((page_num, ""))
+    return extracted
+
 class PDFProcessor:
     """Service for processing PDF documents and generating embeddings."""
     
@@ -49,6 +96,13 @@ class PDFProcessor:
             
         self.embedding_config = get_embedding_config()
         self.embeddings = None  # Initialize lazily when needed
+        self._query_cache = None  # Opened lazily on the first query
+        # Micro-batcher state; created lazily on the serving event loop.
+        self._embed_queue = None
+        self._embed_worker = None
+        # The encoder is internally parallel, so stacking more concurrent
+        # forward passes than this just thrashes its thread pool.
+        self._embed_semaphore = asyncio.Semaphore(settings.EMBED_MAX_INFLIGHT)
         
         # Initialize text splitter for chunking
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -65,31 +119,109 @@ class PDFProcessor:
     def _initialize_embeddings(self):
         """Initialize HuggingFace embedding service."""
         try:
-            # Use HuggingFace embeddings
+            # Use HuggingFace embeddings. The encoder batch size is the
+            # batching lever for a local model: larger batches amortize
+            # tokenization/forward-pass overhead across a whole PDF.
             self.embeddings = HuggingFaceEmbeddings(
-                model_name=self.embedding_config["model"]
+                model_name=self.embedding_config["model"],
+                encode_kwargs={"batch_size": settings.EMBED_BATCH_SIZE}
             )
             logger.info("HuggingFace embeddings initialized")
         except Exception as e:
             logger.error(f"Failed to initialize embeddings: {e}")
             raise
     
-    async def extract_text_from_pdf(self, file_path: str) -> Dict[str, Any]:
+    async def warm_up(self):
+        """Load the embedding model off the event loop if not loaded yet."""
+        if self.embeddings is None:
+            await asyncio.to_thread(self._initialize_embeddings)
+            # One tiny encode flushes the tokenizer and kernel lazy
+            # initialization so the first real request doesn't pay it.
+            await asyncio.to_thread(self.embeddings.embed_query, "warm up")
+
+    def _ensure_embed_batcher(self) -> asyncio.Queue:
+        """Create the micro-batch queue and its worker task on first use."""
+        if self._embed_queue is None:
+            self._embed_queue = asyncio.Queue()
+            self._embed_worker = asyncio.create_task(self._embed_batch_worker())
+        return self._embed_queue
+
+    async def _embed_batch_worker(self) -> None:
+        """Coalesce concurrent query embeddings into one encoder batch.
+
+        Each drain waits up to EMBED_MICROBATCH_WINDOW_SECONDS for more
+        queries after the first arrives, dedupes identical texts, and runs
+        a single embed_documents forward pass for the whole batch, so a
+        burst of concurrent searches pays one model invocation instead of
+        one each.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._embed_queue.get()]
+            deadline = loop.time() + EMBED_MICROBATCH_WINDOW_SECONDS
+            while len(batch) < EMBED_MICROBATCH_MAX_ITEMS:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self._embed_queue.get(), remaining)
+                    )
+                except asyncio.TimeoutError:
+                    break
+
+            # Dedupe identical texts within the batch.
+            texts = []
+            positions = {}
+            for text, _ in batch:
+                if text not in positions:
+                    positions[text] = len(texts)
+                    texts.append(text)
+
+            try:
+                if self.embeddings is None:
+                    self._initialize_embeddings()
+                async with self._embed_semaphore:
+                    vectors = await asyncio.to_thread(
+                        self.embeddings.embed_documents, texts
+                    )
+                for text, future in batch:
+                    if not future.done():
+                        future.set_result(
+                            np.asarray(vectors[positions[text]], dtype=np.float32)
+                        )
+            except Exception as exc:
+                logger.error(f"Batched query embedding failed: {exc}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+
+    async def extract_text_from_pdf(
+        self,
+        file_path: str,
+        file_hash: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """Extract text content from a PDF file.
-        
+
         Args:
             file_path: Path to the PDF file
-            
+            file_hash: Precomputed SHA-256 of the file; hashed here if absent
+
         Returns:
             dict: Extracted text and metadata
         """
         try:
             logger.info(f"Extracting text from PDF: {file_path}")
             
-            # Read PDF file
-            with open(file_path, 'rb') as file:
-                pdf_reader = PdfReader(file)
-                
+            # Map the file once: the same buffer backs the PDF reader and,
+            # when the upload route did not already hash the stream, the
+            # dedupe digest — so the bytes cross from disk a single time.
+            with open(file_path, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if file_hash is None:
+                    file_hash = hashlib.sha256(memoryview(mapped)).hexdigest()
+                pdf_reader = PdfReader(mapped)
+
                 # Extract metadata
                 metadata = {
                     "file_path": file_path,
@@ -108,25 +240,48 @@ class PDFProcessor:
                         "creator": pdf_reader.metadata.get("/Creator", "")
                     })
                 
-                # Extract text from all pages
-                full_text = ""
+                # Extract text from all pages. Large PDFs fan out page
+                # ranges across the process pool; small ones stay serial
+                # where the pool overhead would dominate.
+                num_pages = len(pdf_reader.pages)
+                if num_pages >= PDF_PARALLEL_MIN_PAGES:
+                    pool = _get_page_pool()
+                    loop = asyncio.get_running_loop()
+                    span = math.ceil(num_pages / pool._max_workers)
+                    ranges = await asyncio.gather(*[
+                        loop.run_in_executor(
+                            pool, _extract_page_range,
+                            file_path, start, min(start + span, num_pages),
+                        )
+                        for start in range(0, num_pages, span)
+                    ])
+                    extracted = [item for chunk in ranges for item in chunk]
+                else:
+                    extracted = []
+                    for page_num, page in enumerate(pdf_reader.pages):
+                        try:
+                            extracted.append((page_num, page.extract_text()))
+                        except Exception as e:
+                            logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
+                            extracted.append((page_num, ""))
+
+                # Accumulate page sections in a list and join once at the
+                # end; += on a growing string recopies the whole document
+                # for every page.
+                text_parts = []
                 page_texts = []
+                for page_num, page_text in extracted:
+                    if page_text.strip():  # Only add non-empty pages
+                        page_texts.append({
+                            "page_number": page_num + 1,
+                            "text": page_text.strip()
+                        })
+                        text_parts.append(f"\n\n--- Page {page_num + 1} ---\n\n{page_text}")
+                full_text = "".join(text_parts)
                 
-                for page_num, page in enumerate(pdf_reader.pages):
-                    try:
-                        page_text = page.extract_text()
-                        if page_text.strip():  # Only add non-empty pages
-                            page_texts.append({
-                                "page_number": page_num + 1,
-                                "text": page_text.strip()
-                            })
-                            full_text += f"\n\n--- Page {page_num + 1} ---\n\n{page_text}"
-                    except Exception as e:
-                        logger.warning(f"Failed to extract text from page {page_num + 1}: {e}")
-                        continue
-                
-                # Generate file hash for deduplication
-                file_hash = self._generate_file_hash(file_path)
+                # File hash for deduplication: either the digest computed
+                # while the upload streamed to disk, or the one taken from
+                # the mapping above.
                 metadata["file_hash"] = file_hash
                 
                 result = {
@@ -157,9 +312,12 @@ class PDFProcessor:
             
             # Create LangChain document
             document = Document(page_content=text, metadata=metadata)
-            
-            # Split into chunks
-            chunks = self.text_splitter.split_documents([document])
+
+            # Split into chunks. The recursive splitter is pure-Python and
+            # CPU-bound, so large documents run off the event loop.
+            chunks = await asyncio.to_thread(
+                self.text_splitter.split_documents, [document]
+            )
             
             # Add chunk-specific metadata
             for i, chunk in enumerate(chunks):
@@ -187,32 +345,36 @@ class PDFProcessor:
         """
         try:
             logger.info(f"Generating embeddings for {len(chunks)} chunks")
-            
+
+            if not chunks:
+                return []
+
             # Extract texts for embedding
             texts = [chunk.page_content for chunk in chunks]
-            
+
             # Generate embeddings using HuggingFace
             embeddings = await self._generate_huggingface_embeddings(texts)
-            
-            # Combine chunks with embeddings
-            embedded_chunks = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                # Create unique ID using file hash, filename, timestamp, and chunk index
-                file_hash = chunk.metadata.get('file_hash', 'unknown')
-                file_name = chunk.metadata.get('file_name', 'unknown')
-                processed_at = chunk.metadata.get('processed_at', datetime.utcnow().isoformat())
-                
-                # Create a more unique ID to prevent overwrites
-                unique_id = f"{file_hash}_{file_name}_{processed_at}_{i}".replace(' ', '_').replace(':', '-')
-                
-                embedded_chunk = {
-                    "id": unique_id,
+
+            # Every chunk carries the same file-level hash/name/timestamp,
+            # so the sanitized ID prefix is built once; only the chunk index
+            # varies per entry. The index suffix keeps IDs unique and
+            # prevents overwrites across re-uploads.
+            metadata = chunks[0].metadata
+            file_hash = metadata.get('file_hash', 'unknown')
+            file_name = metadata.get('file_name', 'unknown')
+            processed_at = metadata.get('processed_at', datetime.utcnow().isoformat())
+            prefix = f"{file_hash}_{file_name}_{processed_at}".replace(' ', '_').replace(':', '-')
+
+            embedded_chunks = [
+                {
+                    "id": f"{prefix}_{i}",
                     "text": chunk.page_content,
                     "embedding": embedding,
                     "metadata": chunk.metadata
                 }
-                embedded_chunks.append(embedded_chunk)
-            
+                for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+            ]
+
             logger.info(f"Successfully generated embeddings for {len(embedded_chunks)} chunks")
             return embedded_chunks
             
@@ -221,46 +383,85 @@ class PDFProcessor:
             raise
     
     async def _generate_huggingface_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings using HuggingFace models."""
+        """Generate embeddings using HuggingFace models.
+
+        Chunk texts repeat heavily across re-ingestions (the same document
+        after an edit shares most of its chunks), so each text is first
+        looked up in the persistent embedding cache and only the misses go
+        through the model.
+        """
         try:
-            # Initialize embeddings if not already done
+            if self._query_cache is None:
+                self._query_cache = EmbeddingCache()
+
+            model_id = self.embedding_config["model"]
+            embeddings = await asyncio.to_thread(
+                self._query_cache.get_many, model_id, texts
+            )
+            miss_indices = [i for i, vector in enumerate(embeddings) if vector is None]
+            if not miss_indices:
+                logger.info(f"All {len(texts)} chunk embeddings served from cache")
+                return embeddings
+
+            # Initialize the model only when there are misses to embed
             if self.embeddings is None:
                 self._initialize_embeddings()
-            
-            # Use LangChain's HuggingFace embeddings
-            embeddings = await asyncio.to_thread(
-                self.embeddings.embed_documents, texts
+
+            # Use LangChain's HuggingFace embeddings. The semaphore caps
+            # concurrent forward passes across upload workers and the query
+            # micro-batcher.
+            miss_texts = [texts[i] for i in miss_indices]
+            async with self._embed_semaphore:
+                vectors = await asyncio.to_thread(
+                    self.embeddings.embed_documents, miss_texts
+                )
+            vectors = [np.asarray(vector, dtype=np.float32) for vector in vectors]
+            await asyncio.to_thread(
+                self._query_cache.put_many, model_id, miss_texts, vectors
             )
+            for index, vector in zip(miss_indices, vectors):
+                embeddings[index] = vector
             return embeddings
         except Exception as e:
             logger.error(f"HuggingFace embedding generation failed: {e}")
             raise
     
-    async def process_pdf(self, file_path: str) -> Dict[str, Any]:
+    async def process_pdf(
+        self,
+        file_path: str,
+        file_hash: Optional[str] = None,
+    ) -> Dict[str, Any]:
         """Complete PDF processing pipeline: extract, chunk, and embed.
-        
+
         Args:
             file_path: Path to the PDF file
-            
+            file_hash: Precomputed SHA-256 of the file, if already known
+
         Returns:
             dict: Processing results with embedded chunks
         """
         try:
             logger.info(f"Starting complete PDF processing for: {file_path}")
-            
+
+            # Kick off the embedding model load now so a cold process pays
+            # it concurrently with extraction and chunking instead of after
+            # them; warm processes return immediately.
+            warm_up_task = asyncio.create_task(self.warm_up())
+
             # Step 1: Extract text from PDF
-            extraction_result = await self.extract_text_from_pdf(file_path)
-            
+            extraction_result = await self.extract_text_from_pdf(file_path, file_hash=file_hash)
+
             if not extraction_result["full_text"].strip():
                 raise ValueError("No text content found in PDF")
-            
+
             # Step 2: Chunk the text
             chunks = await self.chunk_text(
                 extraction_result["full_text"],
                 extraction_result["metadata"]
             )
-            
+
             # Step 3: Generate embeddings
+            await warm_up_task
             embedded_chunks = await self.generate_embeddings(chunks)
             
             # Prepare final result
@@ -292,33 +493,49 @@ class PDFProcessor:
         Returns:
             str: SHA-256 hash of the file
         """
-        hash_sha256 = hashlib.sha256()
         with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            # file_digest (3.11+) streams through libcrypto's fast path
+            # without bouncing every block through Python bytecode.
+            if hasattr(hashlib, "file_digest"):
+                return hashlib.file_digest(f, "sha256").hexdigest()
+            # Fallback: 1 MiB reads keep the syscall count low versus the
+            # old 4 KiB loop.
+            hash_sha256 = hashlib.sha256()
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
                 hash_sha256.update(chunk)
         return hash_sha256.hexdigest()
     
-    async def embed_query(self, query: str) -> List[float]:
+    async def embed_query(self, query: str) -> np.ndarray:
         """Generate embedding for a search query.
-        
+
         Args:
             query: Search query text
-            
+
         Returns:
-            List[float]: Query embedding vector
+            np.ndarray: Query embedding vector (float32), so downstream
+                scoring consumes it without per-call list conversion
         """
         try:
-            # Initialize embeddings if not already done
-            if self.embeddings is None:
-                self._initialize_embeddings()
-            
-            # Generate embedding using HuggingFace
-            embedding = await asyncio.to_thread(
-                self.embeddings.embed_query, query
-            )
-            
+            # Warm queries come straight from the persistent cache; the
+            # model (and its load) is only touched on a miss.
+            if self._query_cache is None:
+                self._query_cache = EmbeddingCache()
+
+            model_id = self.embedding_config["model"]
+            cached = self._query_cache.get(model_id, query)
+            if cached is not None:
+                return cached
+
+            # Cache miss: go through the micro-batcher so concurrent
+            # requests share a single encoder forward pass.
+            queue = self._ensure_embed_batcher()
+            future = asyncio.get_running_loop().create_future()
+            queue.put_nowait((query, future))
+            embedding = await future
+
+            self._query_cache.put(model_id, query, embedding)
             return embedding
-            
+
         except Exception as e:
             logger.error(f"Failed to generate query embedding: {e}")
             raise
\ No newline at end of file
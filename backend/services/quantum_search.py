@@ -7,23 +7,74 @@ This service implements:
 - Quantum-enhanced document retrieval
 """
 
+import asyncio
 import math
 import logging
+import os
 import re
-from typing import List, Dict, Any
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 
 # Qiskit for quantum computing
 from qiskit import QuantumCircuit, QuantumRegister, ClassicalRegister
 from qiskit import transpile
 from qiskit_aer import AerSimulator
-from qiskit.circuit.library import ZGate
+from qiskit.circuit.library import ZGate, Diagonal
 
 # Configuration
 from config import settings
 
+# SimSIMD ships hand-tuned AVX2/AVX-512 cosine kernels that beat generic
+# BLAS on the 384-dim float32 vectors used here. It is an optional
+# accelerator: when absent, the NumPy matrix product below is used instead.
+try:
+    import simsimd
+except ImportError:
+    simsimd = None
+
 logger = logging.getLogger(__name__)
 
+# Transpiled Grover circuits keyed by (num_qubits, iterations, marked set).
+# Identical queries across sessions mark the same indices, and transpilation
+# costs tens of milliseconds per call, so repeats reuse the compiled circuit
+# and only the simulator run executes per call. The diffuser depends solely
+# on the qubit count and is cached separately.
+_TRANSPILED_CACHE_MAX = 256
+_transpiled_circuits: "OrderedDict[Tuple, Any]" = OrderedDict()
+_diffuser_circuits: Dict[int, "QuantumCircuit"] = {}
+_circuit_cache_lock = threading.Lock()
+
+
+def _batch_cosine(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every matrix row against the query vector.
+
+    Args:
+        matrix: Document embeddings, shape (N, d), float32
+        query: Query embedding, shape (d,), float32
+
+    Returns:
+        np.ndarray: Similarity per row, float32
+    """
+    if simsimd is not None:
+        distances = simsimd.cdist(matrix, query[np.newaxis, :], metric="cosine")
+        similarities = 1.0 - np.asarray(distances, dtype=np.float32).reshape(-1)
+        # Zero-norm rows come back NaN from the kernel; score them 0.
+        return np.nan_to_num(similarities, nan=0.0)
+
+    query_norm = float(np.linalg.norm(query))
+    if query_norm == 0.0:
+        return np.zeros(matrix.shape[0], dtype=np.float32)
+    doc_norms = np.linalg.norm(matrix, axis=1)
+    # Zero-norm documents score 0 rather than dividing by zero; the clamp
+    # keeps the whole row path branchless.
+    np.maximum(doc_norms, 1e-12, out=doc_norms)
+    doc_norms *= query_norm
+    similarities = matrix @ query
+    similarities /= doc_norms
+    return similarities
+
 class QuantumSearch:
     """Quantum search service using Grover's Algorithm for enhanced vector search."""
     
@@ -34,46 +85,91 @@ class QuantumSearch:
         self.quantum_shots = settings.QUANTUM_SHOTS
         
         logger.info(f"QuantumSearch initialized with max {self.max_qubits} qubits")
-    
+
+    def warm_up(self) -> None:
+        """Exercise the scoring kernel once so first-query latency stays flat.
+
+        The first _batch_cosine call pays one-time costs (BLAS thread-pool
+        spin-up, SimSIMD ISA dispatch selection). Running it here on a tiny
+        synthetic batch moves that cost into startup.
+        """
+        matrix = np.zeros((4, 8), dtype=np.float32)
+        query = np.ones(8, dtype=np.float32)
+        _batch_cosine(matrix, query)
+        logger.debug("Scoring kernel warm-up completed")
+
     def _calculate_similarity_scores(
-        self, 
-        query_embedding: List[float], 
-        document_embeddings: List[List[float]]
+        self,
+        query_embedding: List[float],
+        document_embeddings: "List[List[float]] | np.ndarray"
     ) -> List[float]:
         """Calculate cosine similarity scores between query and documents.
-        
+
         Args:
             query_embedding: Query embedding vector
-            document_embeddings: List of document embedding vectors
-            
+            document_embeddings: Document embedding vectors, as a list of
+                vectors or an already-stacked (N, d) matrix
+
         Returns:
             List[float]: Similarity scores for each document
         """
         try:
-            query_array = np.array(query_embedding)
-            similarities = []
-            
-            for doc_embedding in document_embeddings:
-                doc_array = np.array(doc_embedding)
-                
-                # Calculate cosine similarity
-                dot_product = np.dot(query_array, doc_array)
-                query_norm = np.linalg.norm(query_array)
-                doc_norm = np.linalg.norm(doc_array)
-                
-                if query_norm == 0 or doc_norm == 0:
-                    similarity = 0.0
-                else:
-                    similarity = dot_product / (query_norm * doc_norm)
-                
-                similarities.append(max(0.0, similarity))  # Ensure non-negative
-            
-            return similarities
-            
+            if len(document_embeddings) == 0:
+                return []
+
+            # One contiguous float32 matrix turns the whole scoring pass into
+            # a single SIMD/BLAS batch instead of a per-document Python loop
+            # re-packing each embedding.
+            matrix = np.ascontiguousarray(document_embeddings, dtype=np.float32)
+            query_array = np.ascontiguousarray(query_embedding, dtype=np.float32)
+
+            similarities = _batch_cosine(matrix, query_array)
+            # Ensure non-negative, clamped in place without a branch per row.
+            np.maximum(similarities, 0.0, out=similarities)
+
+            return similarities.tolist()
+
         except Exception as e:
             logger.error(f"Failed to calculate similarity scores: {e}")
             return [0.0] * len(document_embeddings)
 
+    async def _score_candidates(
+        self,
+        query_embedding: List[float],
+        document_embeddings: "List[List[float]] | np.ndarray"
+    ) -> List[float]:
+        """Score candidates off the event loop, sharded across cores.
+
+        Small sets are scored inline (one BLAS call beats thread handoff),
+        while large fallback scans are split row-wise across worker threads.
+        BLAS releases the GIL, so the shards genuinely run in parallel and
+        the event loop stays free for other requests meanwhile. When the
+        caller passes an already-stacked matrix, the shards are contiguous
+        row views into it rather than re-packed list slices.
+
+        Args:
+            query_embedding: Query embedding vector
+            document_embeddings: Document embedding vectors, as a list of
+                vectors or an already-stacked (N, d) matrix
+
+        Returns:
+            List[float]: Similarity scores for each document
+        """
+        shard_count = min(os.cpu_count() or 1, 4)
+        if len(document_embeddings) < 2048 or shard_count < 2:
+            return self._calculate_similarity_scores(query_embedding, document_embeddings)
+
+        shard_size = math.ceil(len(document_embeddings) / shard_count)
+        partials = await asyncio.gather(*[
+            asyncio.to_thread(
+                self._calculate_similarity_scores,
+                query_embedding,
+                document_embeddings[offset:offset + shard_size],
+            )
+            for offset in range(0, len(document_embeddings), shard_size)
+        ])
+        return [score for partial in partials for score in partial]
+
     def _is_low_information_document(self, text: str) -> bool:
         """Return True for structural/marker chunks that should not drive answers."""
         if not text:
@@ -102,9 +198,16 @@ class QuantumSearch:
         for item in ranked_items:
             doc_text = item.get("document", {}).get("document", "")
             if self._is_low_information_document(doc_text):
-                low_information_items.append(item)
+                # Low-info chunks are only ever used as backfill, so keeping
+                # more than top_k of them is wasted work.
+                if len(low_information_items) < top_k:
+                    low_information_items.append(item)
             else:
                 informative_items.append(item)
+                # Enough informative chunks: later (lower-ranked) items can
+                # never be selected, so skip their content checks entirely.
+                if len(informative_items) >= top_k:
+                    break
 
         if informative_items:
             selected = informative_items[:top_k]
@@ -125,30 +228,15 @@ class QuantumSearch:
         Returns:
             QuantumCircuit: Oracle circuit
         """
+        # One diagonal with -1 on the marked basis states is the whole
+        # phase-flip oracle: O(K) to build instead of an X/MCZ ladder per
+        # marked item, and the simulator applies it as a single diagonal
+        # operation rather than a decomposed gate sequence.
+        diagonal = np.ones(2 ** num_qubits, dtype=complex)
+        diagonal[np.asarray(marked_items, dtype=np.int64)] = -1
+
         oracle = QuantumCircuit(num_qubits)
-        
-        # Mark each target item by flipping its phase
-        for item in marked_items:
-            # Convert item index to binary representation
-            binary_repr = format(item, f'0{num_qubits}b')
-            
-            # Apply X gates to qubits that should be 0 in the target state
-            for i, bit in enumerate(binary_repr):
-                if bit == '0':
-                    oracle.x(i)
-            
-            # Apply multi-controlled Z gate
-            if num_qubits == 1:
-                oracle.z(0)
-            else:
-                mcz_gate = ZGate().control(num_qubits - 1)
-                oracle.append(mcz_gate, list(range(num_qubits)))
-            
-            # Undo X gates
-            for i, bit in enumerate(binary_repr):
-                if bit == '0':
-                    oracle.x(i)
-        
+        oracle.append(Diagonal(diagonal.tolist()), range(num_qubits))
         return oracle
     
     def _create_diffuser(self, num_qubits: int) -> QuantumCircuit:
@@ -160,6 +248,13 @@ class QuantumSearch:
         Returns:
             QuantumCircuit: Diffuser circuit
         """
+        # The diffuser is fully determined by the qubit count; compose()
+        # never mutates it, so one instance per size is shared.
+        with _circuit_cache_lock:
+            cached = _diffuser_circuits.get(num_qubits)
+        if cached is not None:
+            return cached
+
         diffuser = QuantumCircuit(num_qubits)
         
         # Apply Hadamard gates
@@ -177,25 +272,31 @@ class QuantumSearch:
         
         # Undo X gates
         diffuser.x(range(num_qubits))
-        
+
         # Undo Hadamard gates
         diffuser.h(range(num_qubits))
-        
+
+        with _circuit_cache_lock:
+            _diffuser_circuits[num_qubits] = diffuser
         return diffuser
     
     def _run_grovers_algorithm(
-        self, 
-        num_items: int, 
-        marked_items: List[int]
-    ) -> Dict[int, float]:
+        self,
+        num_items: int,
+        marked_items: List[int],
+        force_analytic: bool = False
+    ) -> Optional[np.ndarray]:
         """Run Grover's Algorithm to find marked items.
-        
+
         Args:
             num_items: Total number of items to search
             marked_items: Indices of items to find
-            
+            force_analytic: Use the closed-form distribution even when the
+                circuit simulator is enabled
+
         Returns:
-            Dict[int, float]: Probability distribution over items
+            Probability per item index as a float32 vector, or None when
+            the distribution could not be computed
         """
         try:
             # Calculate number of qubits needed
@@ -208,84 +309,161 @@ class QuantumSearch:
                 num_items = min(num_items, 2**num_qubits)
             
             # Calculate optimal number of iterations
+            marked_items = [item for item in marked_items if item < num_items]
             if len(marked_items) == 0:
-                return {}
-            
+                return None
+
             optimal_iterations = math.floor(
                 math.pi / 4 * math.sqrt(num_items / len(marked_items))
             )
             optimal_iterations = max(1, min(optimal_iterations, 10))  # Limit iterations
-            
+
             logger.info(f"Running Grover's with {num_qubits} qubits, {optimal_iterations} iterations")
-            
+
+            if settings.QUANTUM_USE_REAL_SIMULATOR and not force_analytic:
+                return self._simulate_grover_circuit(
+                    num_items, marked_items, num_qubits, optimal_iterations
+                )
+            return self._grover_distribution(
+                num_items, marked_items, num_qubits, optimal_iterations
+            )
+
+        except Exception as e:
+            logger.error(f"Grover's algorithm execution failed: {e}")
+            return None
+
+    def _grover_distribution(
+        self,
+        num_items: int,
+        marked_items: List[int],
+        num_qubits: int,
+        iterations: int,
+    ) -> np.ndarray:
+        """Closed-form Grover measurement distribution.
+
+        After k iterations over 2**n uniform states with M marked, the
+        total marked probability is sin^2((2k+1)*theta) with
+        sin^2(theta) = M / 2**n, split uniformly within each group. The
+        circuit simulation only ever sampled this known distribution, so
+        computing it directly gives the same boost without circuit
+        construction, transpilation, or AerSimulator shots.
+        """
+        state_count = 2 ** num_qubits
+        marked_count = len(marked_items)
+        theta = math.asin(math.sqrt(marked_count / state_count))
+        p_marked = math.sin((2 * iterations + 1) * theta) ** 2
+
+        per_marked = p_marked / marked_count
+        unmarked_states = state_count - marked_count
+        per_unmarked = (
+            (1.0 - p_marked) / unmarked_states if unmarked_states else 0.0
+        )
+
+        probabilities = np.full(num_items, per_unmarked, dtype=np.float32)
+        probabilities[np.asarray(marked_items, dtype=np.int64)] = per_marked
+        return probabilities
+
+    def _simulate_grover_circuit(
+        self,
+        num_items: int,
+        marked_items: List[int],
+        num_qubits: int,
+        iterations: int,
+    ) -> np.ndarray:
+        """Sample the Grover distribution from an Aer circuit simulation."""
+        cache_key = (num_qubits, iterations, tuple(sorted(marked_items)))
+        with _circuit_cache_lock:
+            transpiled_circuit = _transpiled_circuits.get(cache_key)
+            if transpiled_circuit is not None:
+                _transpiled_circuits.move_to_end(cache_key)
+
+        if transpiled_circuit is None:
             # Create quantum circuit
             qreg = QuantumRegister(num_qubits, 'q')
             creg = ClassicalRegister(num_qubits, 'c')
             circuit = QuantumCircuit(qreg, creg)
-            
+
             # Initialize superposition
             circuit.h(range(num_qubits))
-            
+
             # Create oracle and diffuser
             oracle = self._create_oracle(marked_items, num_qubits)
             diffuser = self._create_diffuser(num_qubits)
-            
+
             # Apply Grover iterations
-            for _ in range(optimal_iterations):
+            for _ in range(iterations):
                 circuit.compose(oracle, inplace=True)
                 circuit.compose(diffuser, inplace=True)
-            
+
             # Measure
             circuit.measure(range(num_qubits), range(num_qubits))
-            
-            # Execute circuit
+
             transpiled_circuit = transpile(circuit, self.simulator)
-            job = self.simulator.run(transpiled_circuit, shots=self.quantum_shots)
-            result = job.result()
-            counts = result.get_counts()
-            
-            # Convert counts to probabilities
-            probabilities = {}
-            for bitstring, count in counts.items():
-                index = int(bitstring, 2)
-                if index < num_items:  # Only consider valid indices
-                    probabilities[index] = count / self.quantum_shots
-            
-            return probabilities
-            
-        except Exception as e:
-            logger.error(f"Grover's algorithm execution failed: {e}")
-            return {}
+            with _circuit_cache_lock:
+                _transpiled_circuits[cache_key] = transpiled_circuit
+                while len(_transpiled_circuits) > _TRANSPILED_CACHE_MAX:
+                    _transpiled_circuits.popitem(last=False)
+
+        # Execute circuit
+        job = self.simulator.run(transpiled_circuit, shots=self.quantum_shots)
+        result = job.result()
+        counts = result.get_counts()
+
+        # Convert counts to probabilities in one vectorized pass; bitstring
+        # keys are unique, so plain fancy assignment suffices.
+        keys = np.fromiter(
+            (int(bitstring, 2) for bitstring in counts),
+            dtype=np.int64,
+            count=len(counts),
+        )
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        valid = keys < num_items  # Only consider valid indices
+        probabilities = np.zeros(num_items, dtype=np.float32)
+        probabilities[keys[valid]] = values[valid] / self.quantum_shots
+        return probabilities
     
     async def quantum_enhanced_search(
         self,
         query_embedding: List[float],
         document_embeddings: List[Dict[str, Any]],
         similarity_threshold: float = 0.7,
-        top_k: int = 5
+        top_k: int = 5,
+        embedding_matrix: Optional[np.ndarray] = None
     ) -> Dict[str, Any]:
         """Perform quantum-enhanced similarity search.
-        
+
         Args:
             query_embedding: Query embedding vector
             document_embeddings: List of documents with embeddings
             similarity_threshold: Minimum similarity for quantum marking
             top_k: Number of top results to return
-            
+            embedding_matrix: Optional pre-stacked (N, d) float32 matrix of
+                the candidates' embeddings, row-aligned with
+                document_embeddings; rows may be unit-normalized since
+                cosine ranking is scale-invariant
+
         Returns:
             Dict with ranked results and the actual search method used
         """
+        similarity_scores: Optional[List[float]] = None
         try:
             logger.info(f"Starting quantum-enhanced search for {len(document_embeddings)} documents")
-            
+
             if not document_embeddings:
                 return {"results": [], "search_method": "none"}
-            
-            # Extract embeddings for similarity calculation
-            embeddings = [doc["embedding"] for doc in document_embeddings]
-            
+
+            # Stack embeddings once unless the caller already holds the
+            # matrix; the scoring stages below slice it instead of
+            # re-packing per-document lists.
+            if embedding_matrix is not None:
+                embeddings = embedding_matrix
+            else:
+                embeddings = np.ascontiguousarray(
+                    [doc["embedding"] for doc in document_embeddings], dtype=np.float32
+                )
+
             # Calculate classical similarity scores
-            similarity_scores = self._calculate_similarity_scores(
+            similarity_scores = await self._score_candidates(
                 query_embedding, embeddings
             )
             
@@ -321,12 +499,26 @@ class QuantumSearch:
                     "fallback_reason": "too_many_documents",
                 }
             
-            # Run Grover's Algorithm
+            # Run Grover's Algorithm. When the marked set already covers
+            # top_k (or every document), amplification is uniform within
+            # the marked set and cannot change which items are selected or
+            # their order, so simulating the circuit buys nothing — the
+            # closed-form distribution is used regardless of the simulator
+            # setting.
+            grover_is_moot = (
+                len(marked_items) >= top_k
+                or len(marked_items) == len(document_embeddings)
+            )
+            if grover_is_moot:
+                logger.debug(
+                    "Marked set covers top_k; using analytic Grover distribution"
+                )
             quantum_probabilities = self._run_grovers_algorithm(
-                len(document_embeddings), marked_items
+                len(document_embeddings), marked_items,
+                force_analytic=grover_is_moot,
             )
 
-            if not quantum_probabilities:
+            if quantum_probabilities is None or not quantum_probabilities.size:
                 logger.info("Grover probabilities were empty, using classical fallback")
                 fallback = await self._classical_top_k_search(
                     document_embeddings, similarity_scores, top_k, search_method="classical_fallback"
@@ -338,24 +530,33 @@ class QuantumSearch:
                 }
             
             # Combine quantum probabilities with classical similarities
-            enhanced_scores = []
-            for i, doc in enumerate(document_embeddings):
-                classical_score = similarity_scores[i]
-                quantum_boost = quantum_probabilities.get(i, 0.0)
-                
-                # Combine scores (quantum boost amplifies high-similarity items)
-                enhanced_score = classical_score * (1 + quantum_boost * settings.QUANTUM_BOOST_FACTOR)
-                
-                enhanced_scores.append({
-                    "index": i,
-                    "document": doc,
-                    "classical_similarity": classical_score,
-                    "quantum_probability": quantum_boost,
-                    "enhanced_score": enhanced_score
-                })
-            
-            # Sort by enhanced score
-            enhanced_scores.sort(key=lambda x: x["enhanced_score"], reverse=True)
+            # (quantum boost amplifies high-similarity items), then select
+            # the ranking head with argpartition rather than sorting all N
+            # entries — only a bounded head can ever be returned, mirroring
+            # _classical_top_k_search. Dicts are built for the head only.
+            scores = np.asarray(similarity_scores, dtype=np.float32)
+            boosts = np.zeros(scores.shape[0], dtype=np.float32)
+            span = min(boosts.shape[0], quantum_probabilities.shape[0])
+            boosts[:span] = quantum_probabilities[:span]
+            enhanced = scores * (1.0 + boosts * settings.QUANTUM_BOOST_FACTOR)
+
+            cap = min(enhanced.shape[0], max(top_k * 4, 32))
+            if cap < enhanced.shape[0]:
+                head = np.argpartition(enhanced, -cap)[-cap:]
+                head = head[np.argsort(enhanced[head])[::-1]]
+            else:
+                head = np.argsort(enhanced)[::-1]
+
+            enhanced_scores = [
+                {
+                    "index": int(i),
+                    "document": document_embeddings[int(i)],
+                    "classical_similarity": float(scores[i]),
+                    "quantum_probability": float(boosts[i]),
+                    "enhanced_score": float(enhanced[i]),
+                }
+                for i in head
+            ]
             top_results = self._prioritize_informative_results(enhanced_scores, top_k)
             
             # Format results
@@ -378,10 +579,17 @@ class QuantumSearch:
             
         except Exception as e:
             logger.error(f"Quantum-enhanced search failed: {e}")
-            # Fall back to classical search
+            # Fall back to classical search, reusing the similarity scores
+            # already computed in the main path; they are only rebuilt when
+            # the failure happened before scoring finished.
+            if similarity_scores is None:
+                similarity_scores = self._calculate_similarity_scores(
+                    query_embedding,
+                    [doc["embedding"] for doc in document_embeddings],
+                )
             fallback = await self._classical_top_k_search(
-                document_embeddings, 
-                self._calculate_similarity_scores(query_embedding, [doc["embedding"] for doc in document_embeddings]),
+                document_embeddings,
+                similarity_scores,
                 top_k,
                 search_method="classical_fallback",
             )
@@ -397,14 +605,18 @@ class QuantumSearch:
         document_embeddings: List[Dict[str, Any]],
         top_k: int = 5,
         search_method: str = "classical",
+        embedding_matrix: Optional[np.ndarray] = None,
     ) -> Dict[str, Any]:
         """Perform pure classical ranking over the provided candidate vectors."""
         if not document_embeddings:
             return {"results": [], "search_method": "none"}
 
-        similarity_scores = self._calculate_similarity_scores(
-            query_embedding,
-            [doc["embedding"] for doc in document_embeddings],
+        if embedding_matrix is None:
+            embedding_matrix = np.ascontiguousarray(
+                [doc["embedding"] for doc in document_embeddings], dtype=np.float32
+            )
+        similarity_scores = await self._score_candidates(
+            query_embedding, embedding_matrix
         )
         results = await self._classical_top_k_search(
             document_embeddings,
@@ -432,33 +644,39 @@ class QuantumSearch:
             List[Dict]: Classical search results
         """
         try:
-            # Combine documents with scores
+            # Only a bounded head of the ranking can ever be selected (top_k
+            # plus room for low-information chunks to be skipped), so select
+            # it with argpartition instead of building and sorting a dict per
+            # candidate.
+            scores = np.asarray(similarity_scores, dtype=np.float32)
+            cap = min(len(scores), max(top_k * 4, 32))
+            if cap < len(scores):
+                ranked_indices = np.argpartition(scores, -cap)[-cap:]
+                ranked_indices = ranked_indices[np.argsort(scores[ranked_indices])[::-1]]
+            else:
+                ranked_indices = np.argsort(scores)[::-1]
+
             scored_docs = [
                 {
-                    "index": i,
-                    "document": doc,
-                    "similarity_score": score
+                    "index": int(i),
+                    "document": document_embeddings[int(i)],
+                    "similarity_score": float(scores[int(i)]),
                 }
-                for i, (doc, score) in enumerate(zip(document_embeddings, similarity_scores))
+                for i in ranked_indices
             ]
-            
-            # Sort by similarity score
-            scored_docs.sort(key=lambda x: x["similarity_score"], reverse=True)
             top_results = self._prioritize_informative_results(scored_docs, top_k)
             
-            # Format results
-            formatted_results = []
-            for result in top_results:
-                formatted_result = {
+            # Format the (at most top_k) selected results in one comprehension
+            return [
+                {
                     "id": result["document"]["id"],
                     "document": result["document"]["document"],
                     "metadata": result["document"]["metadata"],
                     "similarity_score": result["similarity_score"],
                     "search_method": search_method
                 }
-                formatted_results.append(formatted_result)
-            
-            return formatted_results
+                for result in top_results
+            ]
             
         except Exception as e:
             logger.error(f"Classical search failed: {e}")
@@ -1,14 +1,234 @@
 """Shared retrieval helpers for vector search timing and method selection."""
 
+import asyncio
 import logging
 import time
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
 
 from .quantum_search import QuantumSearch
 from .vector_store import VectorStore
 
 logger = logging.getLogger(__name__)
 
+# Bounds for the per-scope embedding index cache and the candidate preselect.
+INDEX_CACHE_MAX_SCOPES = 32
+PRESELECT_MIN_CANDIDATES = 32
+
+
+class _EmbeddingIndexCache:
+    """Memoized candidate sets per (session, user) retrieval scope.
+
+    Fetching every session embedding out of Chroma on each chat turn is an
+    O(N·d) materialization; caching the candidate list together with a
+    unit-normalized float32 matrix turns repeat turns into a dictionary hit
+    plus one BLAS matrix-vector product. Entries are invalidated by the
+    vector store's data version, so additions and deletions take effect on
+    the next query.
+    """
+
+    def __init__(self, max_scopes: int = INDEX_CACHE_MAX_SCOPES):
+        self.max_scopes = max_scopes
+        self._entries: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, scope: Tuple, data_version: int) -> Optional[Dict[str, Any]]:
+        """Return the cached entry for a scope if still current."""
+        entry = self._entries.get(scope)
+        if entry is None:
+            return None
+        if entry["data_version"] != data_version:
+            self._entries.pop(scope, None)
+            return None
+        self._entries.move_to_end(scope)
+        return entry
+
+    def put(
+        self,
+        scope: Tuple,
+        data_version: int,
+        candidates: List[Dict[str, Any]],
+        matrix: Optional[np.ndarray],
+        meta_cols: Optional[Dict[str, np.ndarray]] = None,
+        matrix_f32: Optional[np.ndarray] = None,
+        scales: Optional[np.ndarray] = None,
+    ) -> None:
+        """Cache a scope's candidates and their normalized embedding matrix."""
+        self._entries[scope] = {
+            "data_version": data_version,
+            "candidates": candidates,
+            "matrix": matrix,
+            "meta_cols": meta_cols,
+            "matrix_f32": matrix_f32,
+            "scales": scales,
+        }
+        self._entries.move_to_end(scope)
+        while len(self._entries) > self.max_scopes:
+            self._entries.popitem(last=False)
+
+
+_index_cache = _EmbeddingIndexCache()
+
+# One lock per retrieval scope so concurrent cold misses share a single
+# Chroma load instead of each issuing the same full fetch; distinct scopes
+# still build in parallel. Bounded alongside the index cache.
+_scope_locks: "OrderedDict[Tuple, asyncio.Lock]" = OrderedDict()
+
+
+def _get_scope_lock(scope: Tuple) -> asyncio.Lock:
+    """Return the build lock for a scope, creating it on first use."""
+    lock = _scope_locks.get(scope)
+    if lock is None:
+        lock = asyncio.Lock()
+        _scope_locks[scope] = lock
+    _scope_locks.move_to_end(scope)
+    while len(_scope_locks) > INDEX_CACHE_MAX_SCOPES:
+        _scope_locks.popitem(last=False)
+    return lock
+
+
+def _quantize_rows(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quantize each row to int8 with its own float32 scale.
+
+    A unit-normalized embedding's largest component is roughly 1/sqrt(d),
+    so a single global scale would leave most of the int8 range unused.
+    Scaling each row by max|row|/127 spends the full range per vector;
+    multiplying the integer dot products back by the per-row scales keeps
+    them proportional to cosine similarity.
+    """
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    np.maximum(scales, 1e-12, out=scales)
+    quantized = np.round(matrix / scales[:, np.newaxis]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _quantize_vector(vector: np.ndarray) -> np.ndarray:
+    """Quantize one vector to int8 using its own max-abs scale."""
+    scale = max(float(np.abs(vector).max(initial=0.0)), 1e-12) / 127.0
+    return np.round(vector / scale).astype(np.int8)
+
+
+def _build_normalized_matrix(
+    candidates: List[Dict[str, Any]],
+) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[np.ndarray]]:
+    """Stack candidate embeddings into row-normalized float32 and int8 matrices.
+
+    The float32 matrix is the exact-score structure-of-arrays buffer handed
+    to the ranking stage (cosine is scale-invariant, so normalized rows rank
+    identically to the raw embeddings). The per-row int8 quantization of the
+    same rows quarters the memory traffic of the preselect scan; its small
+    error is irrelevant for preselecting a 4x top_k candidate set.
+
+    Returns:
+        Tuple of (float32 matrix, int8 matrix, per-row scales), all None
+        when there are no candidates.
+    """
+    if not candidates:
+        return None, None, None
+    matrix = np.asarray([c["embedding"] for c in candidates], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.maximum(norms, 1e-12, out=norms)
+    matrix /= norms
+    quantized, scales = _quantize_rows(matrix)
+    return matrix, quantized, scales
+
+
+def _preselect_candidates(
+    candidates: List[Dict[str, Any]],
+    matrix: Optional[np.ndarray],
+    scales: Optional[np.ndarray],
+    matrix_f32: Optional[np.ndarray],
+    query_embedding: List[float],
+    top_k: int,
+) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+    """Narrow candidates to the best cosine matches via one matrix product.
+
+    Near-exact inner-product selection over the quantized matrix: the scan
+    runs as a single vectorized kernel and only the survivors are handed to
+    the (comparatively expensive) ranking stage. The survivors' float32
+    rows are returned alongside so ranking can reuse them.
+    """
+    keep = max(top_k * 4, PRESELECT_MIN_CANDIDATES)
+    if matrix is None or len(candidates) <= keep:
+        return candidates, matrix_f32
+
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(query))
+    if norm > 0.0:
+        query = query / norm
+
+    # einsum reads the int8 rows directly and accumulates in int32 (int8
+    # products overflow narrower types); a plain matmul would first
+    # materialize an int32 copy of the matrix, quadrupling the memory
+    # traffic the quantization exists to avoid. The per-row scales re-weight
+    # the integer products back onto a common cosine axis; the query's own
+    # scale is constant across rows and cannot change the ordering.
+    quantized_query = _quantize_vector(query)
+    similarities = np.einsum("ij,j->i", matrix, quantized_query, dtype=np.int32)
+    if scales is not None:
+        similarities = similarities.astype(np.float32) * scales
+    top_indices = np.argpartition(similarities, -keep)[-keep:]
+    # Preserve descending similarity order for downstream consumers.
+    top_indices = top_indices[np.argsort(similarities[top_indices])[::-1]]
+    selected_matrix = matrix_f32[top_indices] if matrix_f32 is not None else None
+    return [candidates[int(i)] for i in top_indices], selected_matrix
+
+
+def _build_metadata_columns(
+    candidates: List[Dict[str, Any]],
+) -> Optional[Dict[str, np.ndarray]]:
+    """Transpose candidate metadata into lowercased per-key columns.
+
+    Column layout turns metadata filtering into C-level array compares
+    instead of a per-document Python loop, and hoists the str().lower()
+    normalization out of the per-query path.
+    """
+    if not candidates:
+        return None
+    keys = set()
+    for candidate in candidates:
+        keys.update(candidate.get("metadata") or {})
+    return {
+        key: np.array(
+            [
+                str((candidate.get("metadata") or {}).get(key, "")).lower()
+                for candidate in candidates
+            ],
+            dtype=object,
+        )
+        for key in keys
+    }
+
+
+def _filter_candidates_vectorized(
+    candidates: List[Dict[str, Any]],
+    meta_cols: Dict[str, np.ndarray],
+    metadata_filter: Dict[str, str],
+    matrix_f32: Optional[np.ndarray] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+    """Apply a metadata filter as boolean masks over the cached columns.
+
+    Returns the surviving candidates together with their float32 embedding
+    rows (when available) so ranking does not restack them.
+    """
+    mask = np.ones(len(candidates), dtype=bool)
+    for key, value in metadata_filter.items():
+        expected = str(value).lower()
+        col = meta_cols.get(key)
+        if col is None:
+            # No candidate carries this key; only an empty filter value can
+            # match, mirroring _matches_metadata_filter's get(key, "").
+            if expected != "":
+                return [], None
+            continue
+        mask &= col == expected
+    indices = np.flatnonzero(mask)
+    selected_matrix = matrix_f32[indices] if matrix_f32 is not None else None
+    return [candidates[int(i)] for i in indices], selected_matrix
+
 
 def _matches_metadata_filter(
     metadata: Dict[str, Any],
@@ -25,6 +245,60 @@ def _matches_metadata_filter(
     return True
 
 
+async def _rank_candidates(
+    candidates: List[Dict[str, Any]],
+    query_embedding: List[float],
+    quantum_search: QuantumSearch,
+    top_k: int,
+    similarity_threshold: float,
+    use_quantum: bool,
+    requested_method: str,
+    retrieval_start: float,
+    candidate_matrix: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Rank a candidate set and package the shared retrieval result."""
+    retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
+
+    if not candidates:
+        logger.info("No candidates found for retrieval")
+        return {
+            "results": [],
+            "retrieval_time_ms": round(retrieval_time_ms, 2),
+            "search_method": "none",
+            "requested_search_method": requested_method,
+            "fallback_reason": "no_candidates",
+            "candidate_count": 0,
+        }
+
+    if use_quantum:
+        ranking_result = await quantum_search.quantum_enhanced_search(
+            query_embedding=query_embedding,
+            document_embeddings=candidates,
+            similarity_threshold=similarity_threshold,
+            top_k=top_k,
+            embedding_matrix=candidate_matrix,
+        )
+    else:
+        ranking_result = await quantum_search.classical_similarity_search(
+            query_embedding=query_embedding,
+            document_embeddings=candidates,
+            top_k=top_k,
+            search_method="classical",
+            embedding_matrix=candidate_matrix,
+        )
+
+    retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
+
+    return {
+        "results": ranking_result["results"],
+        "retrieval_time_ms": round(retrieval_time_ms, 2),
+        "search_method": ranking_result["search_method"],
+        "requested_search_method": requested_method,
+        "fallback_reason": ranking_result.get("fallback_reason"),
+        "candidate_count": len(candidates),
+    }
+
+
 async def retrieve_ranked_documents(
     query_embedding: List[float],
     vector_store: VectorStore,
@@ -41,56 +315,107 @@ async def retrieve_ranked_documents(
     requested_method = "quantum_enhanced" if use_quantum else "classical"
 
     try:
-        candidates = await vector_store.get_all_embeddings(
-            session_id=session_id,
-            user_id=user_id,
-        )
+        # Quantum re-ranking only needs a bounded candidate set, so let the
+        # storage engine run the filtered KNN when it can: metadata filters
+        # are pushed down as a Chroma where clause and only the top
+        # candidates cross into Python instead of the whole collection.
+        ann_query = getattr(vector_store, "query_candidates", None)
+        if use_quantum and ann_query is not None:
+            # Cap at what the quantum circuit can index anyway.
+            candidates = await ann_query(
+                query_embedding=query_embedding,
+                n_results=min(
+                    max(top_k * 4, PRESELECT_MIN_CANDIDATES),
+                    2 ** settings.QUANTUM_MAX_QUBITS,
+                ),
+                session_id=session_id,
+                user_id=user_id,
+                metadata=metadata_filter,
+            )
+            if candidates:
+                return await _rank_candidates(
+                    candidates=candidates,
+                    query_embedding=query_embedding,
+                    quantum_search=quantum_search,
+                    top_k=top_k,
+                    similarity_threshold=similarity_threshold,
+                    use_quantum=use_quantum,
+                    requested_method=requested_method,
+                    retrieval_start=retrieval_start,
+                )
 
-        if metadata_filter:
-            candidates = [
-                candidate
-                for candidate in candidates
-                if _matches_metadata_filter(candidate.get("metadata", {}), metadata_filter)
-            ]
+        scope = (session_id, user_id)
+        # Stores without a data version (e.g. test doubles) cannot signal
+        # invalidation, so their candidates are never cached.
+        data_version = getattr(vector_store, "data_version", None)
+        cached = (
+            _index_cache.get(scope, data_version)
+            if data_version is not None
+            else None
+        )
 
-        retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
+        if cached is None:
+            async with _get_scope_lock(scope):
+                # Another request may have built the entry while this one
+                # waited on the lock; re-check before loading.
+                cached = (
+                    _index_cache.get(scope, data_version)
+                    if data_version is not None
+                    else None
+                )
+                if cached is None:
+                    candidates = await vector_store.get_all_embeddings(
+                        session_id=session_id,
+                        user_id=user_id,
+                    )
+                    matrix_f32, matrix, scales = _build_normalized_matrix(candidates)
+                    meta_cols = None
+                    if data_version is not None:
+                        meta_cols = _build_metadata_columns(candidates)
+                        _index_cache.put(
+                            scope,
+                            data_version,
+                            candidates,
+                            matrix,
+                            meta_cols,
+                            matrix_f32,
+                            scales,
+                        )
+        if cached is not None:
+            candidates = cached["candidates"]
+            matrix = cached["matrix"]
+            meta_cols = cached["meta_cols"]
+            matrix_f32 = cached["matrix_f32"]
+            scales = cached["scales"]
 
-        if not candidates:
-            logger.info("No candidates found for retrieval")
-            return {
-                "results": [],
-                "retrieval_time_ms": round(retrieval_time_ms, 2),
-                "search_method": "none",
-                "requested_search_method": requested_method,
-                "fallback_reason": "no_candidates",
-                "candidate_count": 0,
-            }
-
-        if use_quantum:
-            ranking_result = await quantum_search.quantum_enhanced_search(
-                query_embedding=query_embedding,
-                document_embeddings=candidates,
-                similarity_threshold=similarity_threshold,
-                top_k=top_k,
-            )
+        if metadata_filter:
+            candidate_matrix = None
+            if meta_cols is not None:
+                candidates, candidate_matrix = _filter_candidates_vectorized(
+                    candidates, meta_cols, metadata_filter, matrix_f32
+                )
+            else:
+                candidates = [
+                    candidate
+                    for candidate in candidates
+                    if _matches_metadata_filter(candidate.get("metadata", {}), metadata_filter)
+                ]
         else:
-            ranking_result = await quantum_search.classical_similarity_search(
-                query_embedding=query_embedding,
-                document_embeddings=candidates,
-                top_k=top_k,
-                search_method="classical",
+            candidates, candidate_matrix = _preselect_candidates(
+                candidates, matrix, scales, matrix_f32, query_embedding, top_k
             )
 
-        retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
-
-        return {
-            "results": ranking_result["results"],
-            "retrieval_time_ms": round(retrieval_time_ms, 2),
-            "search_method": ranking_result["search_method"],
-            "requested_search_method": requested_method,
-            "fallback_reason": ranking_result.get("fallback_reason"),
-            "candidate_count": len(candidates),
-        }
+        return await _rank_candidates(
+            candidates=candidates,
+            query_embedding=query_embedding,
+            quantum_search=quantum_search,
+            top_k=top_k,
+            similarity_threshold=similarity_threshold,
+            use_quantum=use_quantum,
+            requested_method=requested_method,
+            retrieval_start=retrieval_start,
+            candidate_matrix=candidate_matrix,
+        )
     except Exception as exc:
         logger.error(f"Shared retrieval failed: {exc}")
         retrieval_time_ms = (time.perf_counter() - retrieval_start) * 1000
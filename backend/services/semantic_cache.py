@@ -0,0 +1,152 @@
+"""Semantic response cache for Gemini chat answers.
+
+This service handles:
+- Caching generated responses keyed by query embedding
+- Cosine-similarity lookup over a stacked float32 matrix
+- LRU eviction with a TTL so stale answers age out
+
+A lookup hit means a near-duplicate prompt was answered recently against the
+same document context, so the Gemini round trip (and its token spend) can be
+skipped entirely.
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Defaults tuned for a single-process deployment: a few hundred recent
+# answers cover the repeated/paraphrased-prompt traffic that matters.
+SEMANTIC_CACHE_MAX_ENTRIES = 256
+SEMANTIC_CACHE_TTL_SECONDS = 300
+SEMANTIC_CACHE_SIMILARITY_THRESHOLD = 0.95
+
+
+def _normalize(embedding: List[float]) -> np.ndarray:
+    """Return the embedding as a unit-length float32 vector."""
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vector))
+    if norm > 0.0:
+        vector = vector / norm
+    return vector
+
+
+class SemanticResponseCache:
+    """In-process semantic cache over (embedding, context, temperature) keys.
+
+    Entries are grouped by a context fingerprint and a temperature bucket so
+    answers generated against different documents (or at different creativity
+    levels) are never cross-shared. Within a group, lookup is a single
+    matrix-vector product over unit-normalized embeddings.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = SEMANTIC_CACHE_TTL_SECONDS,
+        similarity_threshold: float = SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+    ):
+        """Initialize the cache with size, TTL, and similarity bounds."""
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        # Insertion-ordered entry list; oldest entries are evicted first.
+        self._entries: List[Dict[str, Any]] = []
+        # (context_fingerprint, temperature_bucket) -> stacked embedding matrix,
+        # rebuilt lazily after mutation.
+        self._matrices: Dict[tuple, np.ndarray] = {}
+
+    @staticmethod
+    def _bucket(context_fingerprint: str, temperature: float) -> tuple:
+        """Group key: same documents and (rounded) creativity level."""
+        return (context_fingerprint, round(temperature, 1))
+
+    def _prune_expired(self) -> None:
+        """Drop expired entries and invalidate affected matrices."""
+        now = time.monotonic()
+        live = [entry for entry in self._entries if entry["expiry"] > now]
+        if len(live) != len(self._entries):
+            self._entries = live
+            self._matrices.clear()
+
+    def _group_indices(self, bucket: tuple) -> List[int]:
+        """Return indices of live entries belonging to the bucket."""
+        return [
+            index
+            for index, entry in enumerate(self._entries)
+            if entry["bucket"] == bucket
+        ]
+
+    def lookup(
+        self,
+        query_embedding: List[float],
+        context_fingerprint: str,
+        temperature: float,
+    ) -> Optional[str]:
+        """Return a cached response for a semantically similar prompt, if any.
+
+        Args:
+            query_embedding: Embedding of the incoming user message
+            context_fingerprint: Hash of the retrieved context text
+            temperature: Requested response creativity
+
+        Returns:
+            Cached response text on a hit, None otherwise
+        """
+        self._prune_expired()
+
+        bucket = self._bucket(context_fingerprint, temperature)
+        indices = self._group_indices(bucket)
+        if not indices:
+            return None
+
+        matrix = self._matrices.get(bucket)
+        if matrix is None or matrix.shape[0] != len(indices):
+            matrix = np.stack([self._entries[i]["embedding"] for i in indices])
+            self._matrices[bucket] = matrix
+
+        query = _normalize(query_embedding)
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if float(similarities[best]) < self.similarity_threshold:
+            return None
+
+        entry = self._entries[indices[best]]
+        logger.info(
+            "Semantic cache hit (similarity: %.4f)", float(similarities[best])
+        )
+        return entry["response"]
+
+    def put(
+        self,
+        query_embedding: List[float],
+        context_fingerprint: str,
+        temperature: float,
+        response_text: str,
+    ) -> None:
+        """Store a generated response for future semantic lookups."""
+        self._prune_expired()
+
+        bucket = self._bucket(context_fingerprint, temperature)
+        self._entries.append({
+            "embedding": _normalize(query_embedding),
+            "bucket": bucket,
+            "response": response_text,
+            "expiry": time.monotonic() + self.ttl_seconds,
+        })
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(0)
+        # Matrices are rebuilt on the next lookup for the affected buckets.
+        self._matrices.clear()
+
+    def clear(self) -> None:
+        """Drop all cached responses."""
+        self._entries.clear()
+        self._matrices.clear()
+
+
+# Export main class
+__all__ = ["SemanticResponseCache"]
@@ -4,8 +4,12 @@ This module provides singleton instances of services to improve startup performa
 by preventing duplicate model loading and database connections.
 """
 
+import asyncio
 import logging
-from typing import Optional
+import time
+from datetime import datetime, timezone
+from functools import cache
+from typing import Optional, Tuple
 
 from .vector_store import VectorStore
 from .pdf_processor import PDFProcessor
@@ -13,82 +17,127 @@ from .quantum_search import QuantumSearch
 
 logger = logging.getLogger(__name__)
 
-# Global service instances
-_vector_store: Optional[VectorStore] = None
-_pdf_processor: Optional[PDFProcessor] = None
-_quantum_search: Optional[QuantumSearch] = None
+# functools.cache memoizes the factories under an internal lock, so the
+# hand-rolled global-plus-None guards (racy when a threaded server resolves
+# dependencies concurrently) are gone; each service is constructed exactly
+# once per process.
 
+@cache
 def get_vector_store() -> VectorStore:
     """Get the shared VectorStore instance.
-    
+
     Returns:
         VectorStore: Singleton instance
     """
-    global _vector_store
-    if _vector_store is None:
-        _vector_store = VectorStore()
-        logger.info("Created shared VectorStore instance")
-    return _vector_store
+    logger.info("Created shared VectorStore instance")
+    return VectorStore()
 
+@cache
 def get_pdf_processor() -> PDFProcessor:
     """Get the shared PDFProcessor instance.
-    
+
     Returns:
         PDFProcessor: Singleton instance
     """
-    global _pdf_processor
-    if _pdf_processor is None:
-        _pdf_processor = PDFProcessor()
-        logger.info("Created shared PDFProcessor instance")
-    return _pdf_processor
+    logger.info("Created shared PDFProcessor instance")
+    return PDFProcessor()
 
+@cache
 def get_quantum_search() -> QuantumSearch:
     """Get the shared QuantumSearch instance.
-    
+
     Returns:
         QuantumSearch: Singleton instance
     """
-    global _quantum_search
-    if _quantum_search is None:
-        _quantum_search = QuantumSearch()
-        logger.info("Created shared QuantumSearch instance")
-    return _quantum_search
+    logger.info("Created shared QuantumSearch instance")
+    return QuantumSearch()
+
+# Keeps a reference to the deferred warm-up task so it is not garbage collected.
+_warm_up_task: Optional["asyncio.Task"] = None
+
+async def initialize_light_services():
+    """Construct service singletons without loading heavy resources.
+
+    The ChromaDB client and the HuggingFace embedding model stay
+    uninitialized here; both are created lazily on first use (or by the
+    deferred warm-up task scheduled in initialize_services).
+    """
+    get_vector_store()
+    get_pdf_processor()
+    get_quantum_search()
+
+async def _warm_up_heavy_services():
+    """Initialize heavy resources in the background after startup.
+
+    The ChromaDB client and the embedding model are independent, so they
+    warm up concurrently and total warm-up time is the max of the two
+    rather than the sum.
+    """
+    try:
+        await asyncio.gather(
+            get_vector_store().initialize(),
+            get_pdf_processor().warm_up(),
+            asyncio.to_thread(get_quantum_search().warm_up),
+        )
+        logger.info("Deferred service warm-up completed")
+    except Exception as e:
+        logger.error(f"Deferred service warm-up failed (will retry on first use): {e}")
 
 async def initialize_services():
     """Initialize all shared services.
-    
-    This function should be called during application startup to
-    initialize all services and warm up models.
+
+    This function should be called during application startup. Light
+    construction happens inline so route dependencies resolve immediately;
+    the ChromaDB client opens in a background task so startup (and /health
+    readiness) is not blocked on it.
     """
+    global _warm_up_task
+
     logger.info("Initializing shared services...")
-    
-    # Initialize VectorStore
-    vector_store = get_vector_store()
-    await vector_store.initialize()
-    
-    # Initialize PDFProcessor (models will be loaded)
-    pdf_processor = get_pdf_processor()
-    
-    # Initialize QuantumSearch
-    quantum_search = get_quantum_search()
-    
-    logger.info("All shared services initialized successfully")
+
+    await initialize_light_services()
+    _warm_up_task = asyncio.create_task(_warm_up_heavy_services())
+
+    logger.info("Light services initialized; heavy initialization deferred")
 
 async def cleanup_services():
     """Cleanup all shared services.
     
     This function should be called during application shutdown.
     """
-    global _vector_store, _pdf_processor, _quantum_search
-    
+    global _warm_up_task
+
     logger.info("Cleaning up shared services...")
-    
-    if _vector_store:
-        await _vector_store.close()
-        _vector_store = None
-    
-    # Reset other services
-    _pdf_processor = None
-    _quantum_search = None
-    
-    logger.info("All shared services cleaned up")
\ No newline at end of file
+
+    if _warm_up_task and not _warm_up_task.done():
+        _warm_up_task.cancel()
+    _warm_up_task = None
+
+    # Close only if the store was ever constructed; calling the factory
+    # here would create one just to close it.
+    if get_vector_store.cache_info().currsize:
+        await get_vector_store().close()
+
+    # Reset the memoized factories
+    get_vector_store.cache_clear()
+    get_pdf_processor.cache_clear()
+    get_quantum_search.cache_clear()
+
+    logger.info("All shared services cleaned up")
+
+# Response timestamps only need second resolution, so the formatted string
+# is rebuilt at most once per wall-clock second instead of constructing and
+# formatting a datetime on every request. Shared by the chat and query
+# routes so there is a single implementation of the cache.
+_timestamp_cache: Tuple[int, str] = (0, "")
+
+def utc_timestamp() -> str:
+    """Return an ISO-8601 UTC timestamp, cached per wall-clock second."""
+    global _timestamp_cache
+    second = int(time.time())
+    if _timestamp_cache[0] != second:
+        _timestamp_cache = (
+            second,
+            datetime.fromtimestamp(second, timezone.utc).isoformat(),
+        )
+    return _timestamp_cache[1]
\ No newline at end of file
@@ -8,12 +8,20 @@ This service handles:
 - Metadata filtering and querying
 """
 
+import json
 import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 import asyncio
 from pathlib import Path
 
+import numpy as np
+import orjson
+
 # ChromaDB for vector storage
 import chromadb
 from chromadb.config import Settings
@@ -23,12 +31,113 @@ from config import settings
 
 logger = logging.getLogger(__name__)
 
+# How long cached collection stats stay valid between mutations.
+STATS_CACHE_TTL_SECONDS = 5.0
+
+# How long cached similarity_search results stay servable. Mutations clear
+# the cache outright; the TTL only bounds staleness against writes from
+# outside this process.
+QUERY_CACHE_TTL_SECONDS = 60.0
+
+
+def _pack_metadata(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse non-filterable metadata keys into one JSON blob.
+
+    Chroma persists every metadata key as its own row in the
+    embedding_metadata table, so keys the deployment never filters on only
+    bloat that table and its index. Packing is opt-in via
+    CHROMA_FILTERABLE_KEYS and a no-op (flat dict) when unset; the keys the
+    app itself filters or sorts on (session/user scoping, the file_hash
+    dedupe lookup, the chunk_id ordering key) always stay first-class so
+    those paths keep working regardless of operator configuration.
+    """
+    filterable = settings.CHROMA_FILTERABLE_KEYS
+    if not filterable:
+        return metadata
+    keep = set(filterable) | {"session_id", "user_id", "file_hash", "chunk_id"}
+    packed = {key: value for key, value in metadata.items() if key in keep}
+    extra = {key: value for key, value in metadata.items() if key not in keep}
+    if extra:
+        packed["extra"] = orjson.dumps(extra).decode()
+    return packed
+
+
+def _expand_metadata(metadata: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Inverse of _pack_metadata; rows without an extra blob pass through."""
+    if not metadata or "extra" not in metadata:
+        return metadata
+    expanded = dict(metadata)
+    blob = expanded.pop("extra")
+    try:
+        expanded.update(orjson.loads(blob))
+    except orjson.JSONDecodeError:
+        # An app-level metadata key that happens to be named "extra";
+        # leave it untouched.
+        expanded["extra"] = blob
+    return expanded
+
+
+def _hnsw_metadata(description: str) -> Dict[str, Any]:
+    """Collection metadata carrying the tuned HNSW index parameters.
+
+    Chroma only reads these keys at collection creation, so existing
+    collections keep the index they were built with.
+    """
+    return {
+        "description": description,
+        # Stored rows and query vectors are unit-normalized on the Python
+        # side, so inner product equals cosine here — minus the per-vector
+        # normalization work inside the index's distance loop.
+        "hnsw:space": "ip",
+        "hnsw:M": settings.HNSW_M,
+        "hnsw:construction_ef": settings.HNSW_EF_CONSTRUCTION,
+        "hnsw:search_ef": settings.HNSW_EF_SEARCH,
+    }
+
+
+@lru_cache(maxsize=None)
+def _resolve_db_path(configured_path: str) -> str:
+    """Resolve and ensure a writable ChromaDB path, once per configured value.
+
+    Falls back to `<backend>/chroma_db` when the configured path is not writable
+    (for example `/app/chroma_db` during local development). Cached so repeated
+    VectorStore constructions don't re-stat or re-create the directory.
+    """
+    backend_root = Path(__file__).resolve().parent.parent
+    candidate_path = Path(configured_path).expanduser()
+
+    if not candidate_path.is_absolute():
+        candidate_path = backend_root / candidate_path
+
+    try:
+        candidate_path.mkdir(parents=True, exist_ok=True)
+        return str(candidate_path)
+    except PermissionError:
+        fallback_path = backend_root / "chroma_db"
+        fallback_path.mkdir(parents=True, exist_ok=True)
+        logger.warning(
+            "Configured CHROMA_DB_PATH '%s' is not writable. Falling back to '%s'.",
+            str(candidate_path),
+            str(fallback_path),
+        )
+        return str(fallback_path)
+
+
 class VectorStore:
     """Service for managing vector embeddings with ChromaDB persistent storage."""
     
     _instance = None
     _initialized = False
-    
+
+    # Class-level defaults so partially constructed instances (tests build
+    # them with object.__new__ to unit-test single methods) still work;
+    # __init__ shadows these with per-instance state.
+    _data_version = 0
+    _known_empty = None
+    _stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+    _all_emb_cache: Dict[Any, Tuple[float, int, List[Dict[str, Any]]]] = {}
+    _query_cache: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
     def __new__(cls, db_path: Optional[str] = None):
         """Singleton pattern to ensure only one instance exists."""
         if cls._instance is None:
@@ -44,52 +153,76 @@ class VectorStore:
         if self._initialized:
             return
             
-        self.db_path = self._resolve_db_path(db_path or settings.CHROMA_DB_PATH)
+        self.db_path = _resolve_db_path(db_path or settings.CHROMA_DB_PATH)
         self.client = None
         self.collection = None
         self.collection_name = settings.CHROMA_COLLECTION_NAME
-        
+        # Bumped on every mutation so callers can invalidate derived caches
+        # (e.g. per-session embedding indexes) without polling Chroma.
+        self._data_version = 0
+        # Tri-state emptiness signal: True/False once a count has been
+        # observed, None while unknown. Lets the chat path skip context
+        # retrieval without a stats round trip when the store is empty.
+        self._known_empty = None
+        # Short-TTL stats cache: every query reads has_data/total_documents,
+        # which only change on mutation. (monotonic timestamp, stats dict).
+        self._stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        # Full-scan results from get_all_embeddings per (session, user,
+        # filter) scope: (monotonic timestamp, data_version, entries).
+        # Entries hold zero-copy views into one float32 matrix, so a cache
+        # hit skips both the SQLite scan and re-materialization.
+        self._all_emb_cache: Dict[Any, Tuple[float, int, List[Dict[str, Any]]]] = {}
+        # LRU of recent similarity_search results keyed by (query bytes,
+        # n_results, filter, tag): (monotonic timestamp, result dicts).
+        self._query_cache: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+
         VectorStore._initialized = True
         logger.info(f"VectorStore initialized with path: {self.db_path}")
 
-    def _resolve_db_path(self, configured_path: str) -> str:
-        """Resolve and ensure a writable ChromaDB path.
-
-        Falls back to `<backend>/chroma_db` when the configured path is not writable
-        (for example `/app/chroma_db` during local development).
-        """
-        backend_root = Path(__file__).resolve().parent.parent
-        candidate_path = Path(configured_path).expanduser()
-
-        if not candidate_path.is_absolute():
-            candidate_path = backend_root / candidate_path
+    @property
+    def data_version(self) -> int:
+        """Monotonic counter incremented whenever stored documents change."""
+        return self._data_version
 
-        try:
-            candidate_path.mkdir(parents=True, exist_ok=True)
-            return str(candidate_path)
-        except PermissionError:
-            fallback_path = backend_root / "chroma_db"
-            fallback_path.mkdir(parents=True, exist_ok=True)
-            logger.warning(
-                "Configured CHROMA_DB_PATH '%s' is not writable. Falling back to '%s'.",
-                str(candidate_path),
-                str(fallback_path),
-            )
-            return str(fallback_path)
+    @property
+    def known_empty(self):
+        """True/False once emptiness has been observed, None while unknown."""
+        return self._known_empty
     
     async def initialize(self):
         """Initialize ChromaDB client and collection."""
         try:
-            logger.info("Initializing ChromaDB persistent client...")
-            
-            # Create persistent client
-            self.client = chromadb.PersistentClient(
-                path=self.db_path,
-                settings=Settings(
-                    anonymized_telemetry=False,
-                    allow_reset=True
+            if settings.CHROMA_MODE == "server":
+                # Standalone `chroma run` server: SQLite and HNSW work runs
+                # in its own process (and cores) instead of contending with
+                # request handlers for this one. The sync HttpClient keeps
+                # the collection API identical to embedded mode; calls are
+                # already dispatched on worker threads, so the event loop
+                # never blocks on the HTTP round trips either way.
+                logger.info(
+                    "Connecting to ChromaDB server at %s:%s...",
+                    settings.CHROMADB_HOST,
+                    settings.CHROMADB_PORT,
+                )
+                self.client = chromadb.HttpClient(
+                    host=settings.CHROMADB_HOST,
+                    port=settings.CHROMADB_PORT,
+                    settings=Settings(
+                        anonymized_telemetry=False,
+                        allow_reset=True
+                    )
+                )
+            else:
+                logger.info("Initializing ChromaDB persistent client...")
+
+                # Create persistent client
+                self.client = chromadb.PersistentClient(
+                    path=self.db_path,
+                    settings=Settings(
+                        anonymized_telemetry=False,
+                        allow_reset=True
+                    )
                 )
-            )
             
             # Get or create collection
             try:
@@ -101,19 +234,120 @@ class VectorStore:
                 # Collection doesn't exist, create it
                 self.collection = self.client.create_collection(
                     name=self.collection_name,
-                    metadata={"description": "PDF document embeddings for chatbot"},
+                    metadata=_hnsw_metadata("PDF document embeddings for chatbot"),
                     embedding_function=None  # We'll provide embeddings directly
                 )
                 logger.info(f"Created new collection: {self.collection_name}")
             
             # Log collection stats
             count = self.collection.count()
+            self._known_empty = count == 0
             logger.info(f"Collection '{self.collection_name}' contains {count} documents")
-            
+
+            if settings.CHROMA_BULK_MODE:
+                self._tune_sqlite()
+
+            if settings.CHROMA_WARMUP and count > 0:
+                self._warm_up_index()
+
         except Exception as e:
             logger.error(f"Failed to initialize ChromaDB: {e}")
             raise
 
+    def _warm_up_index(self) -> None:
+        """Page the HNSW graph and SQLite rows in with one dummy query.
+
+        Chroma memory-maps the index lazily, so without this the first real
+        similarity_search after process start absorbs the cold-cache I/O.
+        Runs during the deferred warm-up task, i.e. off the request path.
+        """
+        try:
+            started = time.monotonic()
+            sample = self.collection.get(limit=1, include=["embeddings"])
+            if not len(sample["ids"]):
+                return
+            dim = len(sample["embeddings"][0])
+            self.collection.query(
+                query_embeddings=[[0.0] * dim],
+                n_results=1,
+                include=["distances"],
+            )
+            logger.info(
+                "Warmed HNSW index in %.0f ms",
+                (time.monotonic() - started) * 1000,
+            )
+        except Exception as e:
+            logger.warning(f"HNSW warm-up query failed: {e}")
+
+    async def _ensure_ready(self):
+        """Return the live collection, initializing lazily if needed.
+
+        Normally the deferred warm-up task has already run initialize() by
+        the time requests arrive; this covers requests that race the warm-up
+        (or follow a failed one). Callers bind the returned collection to a
+        local so the per-operation attribute lookups happen once.
+        """
+        if self.collection is None:
+            await self.initialize()
+        return self.collection
+
+    def _apply_sqlite_pragmas(self, pragmas: List[str]) -> None:
+        """Execute PRAGMA statements against Chroma's backing SQLite file."""
+        db_file = Path(self.db_path) / "chroma.sqlite3"
+        if not db_file.exists():
+            return
+        connection = sqlite3.connect(str(db_file))
+        try:
+            for pragma in pragmas:
+                connection.execute(f"PRAGMA {pragma}")
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _tune_sqlite(self) -> None:
+        """Relax SQLite durability settings for bulk ingestion.
+
+        Chroma persists through SQLite with default journal/sync settings,
+        so every add() pays an fsync per transaction. journal_mode=WAL is
+        stored in the database file itself and Chroma's own connections
+        inherit it; the per-connection pragmas are additionally pushed into
+        the client's internal pool where the (private) attribute path still
+        exists. Call reset_sqlite_pragmas() after ingest if full durability
+        is required.
+        """
+        per_connection = [
+            "synchronous=NORMAL",
+            "temp_store=MEMORY",
+            "mmap_size=1073741824",
+        ]
+        try:
+            self._apply_sqlite_pragmas(["journal_mode=WAL"] + per_connection)
+            logger.info("Applied bulk-mode SQLite pragmas (WAL, synchronous=NORMAL)")
+        except Exception as e:
+            logger.warning(f"Failed to apply bulk-mode SQLite pragmas: {e}")
+            return
+
+        # Best-effort: the pool layout is private API and shifts between
+        # Chroma releases, so losing this half of the tuning is tolerated.
+        try:
+            pool = self.client._server._sysdb._conn_pool
+            connection = pool.connect()
+            for pragma in per_connection:
+                connection.execute(f"PRAGMA {pragma}")
+        except Exception:
+            logger.debug("Could not tune Chroma's internal connection pool")
+
+    def reset_sqlite_pragmas(self) -> None:
+        """Restore durable SQLite settings after a bulk ingest."""
+        try:
+            self._apply_sqlite_pragmas([
+                "journal_mode=DELETE",
+                "synchronous=FULL",
+            ])
+            logger.info("Restored durable SQLite settings (DELETE journal, synchronous=FULL)")
+        except Exception as e:
+            logger.warning(f"Failed to reset SQLite pragmas: {e}")
+
     @staticmethod
     def _normalize_filter_value(value: Any) -> str:
         """Normalize metadata filter values to match stored Chroma metadata."""
@@ -181,29 +415,34 @@ class VectorStore:
             dict: Operation result with statistics
         """
         try:
-            if not self.collection:
-                await self.initialize()
+            collection = await self._ensure_ready()
             
             logger.info(f"Adding {len(embedded_chunks)} documents to vector store")
             
-            # Prepare data for ChromaDB
-            ids = []
-            embeddings = []
-            documents = []
-            metadatas = []
-            
-            for chunk in embedded_chunks:
-                ids.append(chunk["id"])
-                embeddings.append(chunk["embedding"])
-                documents.append(chunk["text"])
-                
-                # Prepare metadata (ChromaDB requires string values)
-                metadata = {}
-                for key, value in chunk["metadata"].items():
-                    if isinstance(value, (str, int, float, bool)):
-                        metadata[key] = str(value)
-                    elif value is not None:
-                        metadata[key] = str(value)
+            # Prepare data for ChromaDB. Lists are pre-sized and filled by
+            # index (no append-resizing churn on 10k-chunk uploads), and the
+            # second-granularity timestamp is computed once for the batch
+            # instead of once per chunk.
+            n = len(embedded_chunks)
+            ids: List[Any] = [None] * n
+            embeddings: List[Any] = [None] * n
+            documents: List[Any] = [None] * n
+            metadatas: List[Any] = [None] * n
+            added_at = datetime.utcnow().isoformat()
+
+            for i, chunk in enumerate(embedded_chunks):
+                ids[i] = chunk["id"]
+                embeddings[i] = chunk["embedding"]
+                documents[i] = chunk["text"]
+
+                # Prepare metadata (ChromaDB requires string values). The
+                # exact type check is a pointer compare, so values that are
+                # already str (the common case) skip the str() call.
+                metadata = {
+                    key: value if type(value) is str else str(value)
+                    for key, value in chunk["metadata"].items()
+                    if value is not None
+                }
 
                 # Canonical source fields for downstream citation/source answers.
                 source_file_name = (
@@ -222,28 +461,86 @@ class VectorStore:
                 metadata["source"] = source_title if source_title else metadata.get("source_file_name", "Unknown")
                 
                 # Add timestamp
-                metadata["added_at"] = datetime.utcnow().isoformat()
-                metadatas.append(metadata)
-            
-            # Add to collection
-            self.collection.add(
-                ids=ids,
-                embeddings=embeddings,
-                documents=documents,
-                metadatas=metadatas
-            )
+                metadata["added_at"] = added_at
+                metadatas[i] = _pack_metadata(metadata)
             
+            # Persist unit-normalized float32 vectors: cosine against stored
+            # rows then collapses to a plain dot product, saving a norm pass
+            # (d multiplies plus a sqrt per vector) on every query.
+            # Chroma accepts ndarrays directly, so the normalized matrix is
+            # handed over as contiguous float32 rows instead of being boxed
+            # back into lists of Python floats (~28 B/value vs 4 B).
+            matrix = np.asarray(embeddings, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            np.maximum(norms, 1e-12, out=norms)
+            normalized = np.ascontiguousarray(matrix / norms)
+
+            # One id-only lookup tells fresh inserts apart from rewrites of
+            # ids that already exist, so the result can report both counts.
+            try:
+                existing = await asyncio.to_thread(
+                    collection.get, ids=ids, include=[]
+                )
+                existing_ids = set(existing["ids"])
+            except Exception:
+                existing_ids = set()
+
+            # Upsert into the collection in bounded slices: one giant call
+            # forces Chroma to materialize the whole payload at once, and a
+            # single bad record would reject the entire upload. upsert (not
+            # add) makes caller retries after a partial failure idempotent
+            # instead of raising on the ids that already landed. Slices run
+            # on worker threads (Chroma's SQLite layer releases the GIL on
+            # I/O) with a semaphore keeping the number in flight bounded.
+            batch_size = max(settings.CHROMA_ADD_BATCH_SIZE, 1)
+            semaphore = asyncio.Semaphore(max(settings.CHROMA_INSERT_CONCURRENCY, 1))
+
+            async def _add_slice(start: int, stop: int) -> Tuple[int, int]:
+                slice_ids = ids[start:stop]
+                async with semaphore:
+                    try:
+                        await asyncio.to_thread(
+                            collection.upsert,
+                            ids=slice_ids,
+                            embeddings=normalized[start:stop],
+                            documents=documents[start:stop],
+                            metadatas=metadatas[start:stop],
+                        )
+                        updated = sum(
+                            1 for doc_id in slice_ids if doc_id in existing_ids
+                        )
+                        return len(slice_ids), updated
+                    except Exception as batch_error:
+                        logger.error(
+                            f"Failed to add batch {start}-{stop} to vector store: {batch_error}"
+                        )
+                        return 0, 0
+
+            slice_counts = await asyncio.gather(*(
+                _add_slice(start, start + batch_size)
+                for start in range(0, len(ids), batch_size)
+            ))
+            added_count = sum(written for written, _ in slice_counts)
+            updated_count = sum(updated for _, updated in slice_counts)
+
             # Get updated collection stats
-            total_count = self.collection.count()
-            
+            total_count = collection.count()
+            if added_count:
+                self._data_version += 1
+                self._known_empty = total_count == 0
+                self._stats_cache = None
+                self._all_emb_cache.clear()
+                self._query_cache.clear()
+
             result = {
-                "success": True,
-                "added_count": len(embedded_chunks),
+                "success": added_count == len(ids),
+                "added_count": added_count,
+                "updated_count": updated_count,
                 "total_documents": total_count,
                 "collection_name": self.collection_name
             }
-            
-            logger.info(f"Successfully added {len(embedded_chunks)} documents. Total: {total_count}")
+
+            logger.info(f"Successfully added {added_count} documents. Total: {total_count}")
             return result
             
         except Exception as e:
@@ -255,105 +552,313 @@ class VectorStore:
             }
     
     async def similarity_search(
-        self, 
-        query_embedding: List[float], 
+        self,
+        query_embedding: List[float],
         n_results: int = 5,
-        where: Optional[Dict[str, Any]] = None
+        where: Optional[Dict[str, Any]] = None,
+        tag: Optional[str] = None,
+        session_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Perform similarity search using query embedding.
-        
+
+        Session scoping happens inside Chroma's ANN traversal (the filter
+        restricts which graph nodes are visited), so for session-scoped
+        queries this is much cheaper than pulling the session's rows out
+        via get_all_embeddings and filtering in Python.
+
         Args:
             query_embedding: Query embedding vector
             n_results: Number of results to return
             where: Optional metadata filter conditions
-            
+            tag: Optional search_method label stamped on each result here,
+                so callers don't re-walk the list to add it
+            session_id: Optional session scope, merged into the Chroma filter
+
         Returns:
             List[Dict]: Search results with documents and metadata
         """
         try:
-            if not self.collection:
-                await self.initialize()
-            
-            chroma_where = self._build_chroma_where(metadata=where)
+            collection = await self._ensure_ready()
+
+            chroma_where = self._build_chroma_where(metadata=where, session_id=session_id)
             logger.info(f"Performing similarity search for {n_results} results")
             logger.info("Similarity search Chroma filter: %s", chroma_where)
-            
-            # Perform query
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
+
+            # Unit-normalize the query to match the stored rows (the index
+            # space is inner product); as a side effect, rescaled variants of
+            # the same query share one cache entry.
+            query_vector = np.asarray(query_embedding, dtype=np.float32)
+            query_norm = float(np.linalg.norm(query_vector))
+            if query_norm > 1e-12:
+                query_vector = query_vector / query_norm
+
+            # Repeat queries (users re-asking near-identical questions) skip
+            # the HNSW traversal entirely. The raw vector bytes key the cache
+            # exactly — no hash collisions to reason about.
+            cache_key = (
+                query_vector.tobytes(),
+                n_results,
+                json.dumps(chroma_where, sort_keys=True) if chroma_where else None,
+                tag,
+            )
+            cached = self._query_cache.get(cache_key)
+            if cached is not None:
+                cached_at, cached_results = cached
+                if time.monotonic() - cached_at < QUERY_CACHE_TTL_SECONDS:
+                    self._query_cache.move_to_end(cache_key)
+                    logger.info(f"Returning {len(cached_results)} cached search results")
+                    # Shallow per-dict copies so callers can stamp fields
+                    # without mutating the cached entry.
+                    return [dict(result) for result in cached_results]
+                del self._query_cache[cache_key]
+
+            # Perform query off the event loop so concurrent requests are
+            # not serialized behind Chroma's index walk
+            results = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=query_vector.reshape(1, -1),
                 n_results=n_results,
                 where=chroma_where,
                 include=["documents", "metadatas", "distances"]
             )
-            
-            # Format results
+
+            # Format results in one pass over the parallel columns
             formatted_results = []
             if results["documents"] and results["documents"][0]:
-                for i in range(len(results["documents"][0])):
-                    result = {
-                        "id": results["ids"][0][i],
-                        "document": results["documents"][0][i],
-                        "metadata": results["metadatas"][0][i],
-                        "distance": results["distances"][0][i],
-                        "similarity_score": 1 - results["distances"][0][i]  # Convert distance to similarity
+                formatted_results = [
+                    {
+                        "id": doc_id,
+                        "document": document,
+                        "metadata": _expand_metadata(metadata),
+                        "distance": distance,
+                        "similarity_score": 1 - distance,  # Convert distance to similarity
+                        **({"search_method": tag} if tag else {}),
                     }
-                    formatted_results.append(result)
-            
+                    for doc_id, document, metadata, distance in zip(
+                        results["ids"][0],
+                        results["documents"][0],
+                        results["metadatas"][0],
+                        results["distances"][0],
+                    )
+                ]
+
+            self._query_cache[cache_key] = (time.monotonic(), formatted_results)
+            while len(self._query_cache) > settings.QUERY_CACHE_SIZE:
+                self._query_cache.popitem(last=False)
+
             logger.info(f"Found {len(formatted_results)} similar documents")
-            return formatted_results
-            
+            return [dict(result) for result in formatted_results]
+
         except Exception as e:
             logger.error(f"Similarity search failed: {e}")
             return []
     
+    async def query_candidates(
+        self,
+        query_embedding: List[float],
+        n_results: int,
+        session_id: Optional[str] = None,
+        user_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Fetch a KNN candidate set (with embeddings) via Chroma's own index.
+
+        Unlike get_all_embeddings, this runs the filtered nearest-neighbour
+        search inside Chroma's HNSW index, so only the top candidates cross
+        the Python boundary instead of the whole collection.
+
+        Args:
+            query_embedding: Query embedding vector
+            n_results: Number of candidates to return
+            session_id: Optional session ID to filter results
+            user_id: Optional user ID to filter results
+            metadata: Optional additional metadata filter
+
+        Returns:
+            List[Dict]: Candidate documents with embeddings and metadata
+        """
+        try:
+            collection = await self._ensure_ready()
+
+            where_filter = self._build_chroma_where(
+                metadata=metadata,
+                session_id=session_id,
+                user_id=user_id,
+            )
+            logger.info(
+                "Querying %s KNN candidates (session: %s, user: %s)",
+                n_results,
+                session_id,
+                user_id,
+            )
+
+            # The HNSW query is CPU-bound; run it off the event loop.
+            results = await asyncio.to_thread(
+                collection.query,
+                query_embeddings=[query_embedding],
+                n_results=n_results,
+                where=where_filter,
+                include=["embeddings", "documents", "metadatas"]
+            )
+
+            candidates = []
+            if results["ids"] and results["ids"][0]:
+                candidates = [
+                    {
+                        "id": doc_id,
+                        "embedding": embedding,
+                        "document": document,
+                        "metadata": _expand_metadata(metadata),
+                    }
+                    for doc_id, embedding, document, metadata in zip(
+                        results["ids"][0],
+                        results["embeddings"][0],
+                        results["documents"][0],
+                        results["metadatas"][0],
+                    )
+                ]
+
+            logger.info("Retrieved %s KNN candidates", len(candidates))
+            return candidates
+
+        except Exception as e:
+            logger.error(f"Candidate query failed: {e}")
+            return []
+
     async def get_all_embeddings(
         self,
         session_id: Optional[str] = None,
         user_id: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        lean: bool = False,
     ) -> List[Dict[str, Any]]:
         """Retrieve all embeddings from the collection for quantum search.
-        
+
         Args:
             session_id: Optional session ID to filter results
             user_id: Optional user ID to filter results
-        
+            metadata: Optional additional metadata filter (e.g. file_hash)
+            lean: Fetch ids and embeddings only (document and metadata come
+                back as None). Document strings dominate the bytes moved out
+                of SQLite, so callers that rank on vectors and hydrate() the
+                final top-k move a fraction of the data
+
         Returns:
             List[Dict]: All documents with embeddings and metadata
         """
         try:
-            if not self.collection:
-                await self.initialize()
-            
+            collection = await self._ensure_ready()
+
+            cache_key = (
+                session_id,
+                user_id,
+                tuple(sorted(metadata.items())) if metadata else None,
+                lean,
+            )
+            cached = self._all_emb_cache.get(cache_key)
+            if cached is not None:
+                cached_at, cached_version, cached_entries = cached
+                if (
+                    cached_version == self._data_version
+                    and time.monotonic() - cached_at < settings.EMBEDDING_CACHE_TTL
+                ):
+                    logger.info(
+                        "Returning %s cached embeddings (session: %s, user: %s)",
+                        len(cached_entries),
+                        session_id,
+                        user_id,
+                    )
+                    return cached_entries
+                del self._all_emb_cache[cache_key]
+
             logger.info(
                 "Retrieving embeddings for quantum search (session: %s, user: %s)",
                 session_id,
                 user_id,
             )
-            
+
             where_filter = self._build_chroma_where(
+                metadata=metadata,
                 session_id=session_id,
                 user_id=user_id,
             )
             logger.info("Quantum retrieval Chroma filter: %s", where_filter)
             
-            # Get documents (filtered by session if provided)
-            results = self.collection.get(
-                where=where_filter,
-                include=["embeddings", "documents", "metadatas"]
-            )
-            
-            # Format results
+            # Get documents (filtered by session if provided) in bounded
+            # pages rather than one giant result set: a single unbounded get
+            # materializes every row at once inside Chroma's SQLite layer,
+            # which is the out-of-memory path on large collections. Each page
+            # runs on a worker thread.
+            page_size = max(settings.EMBEDDING_PAGE_SIZE, 1)
+            include = ["embeddings"] if lean else ["embeddings", "documents", "metadatas"]
+            doc_ids: List[Any] = []
+            embedding_pages: List[np.ndarray] = []
+            documents_list: List[Any] = []
+            metadatas_list: List[Any] = []
+            offset = 0
+            while True:
+                page = await asyncio.to_thread(
+                    collection.get,
+                    where=where_filter,
+                    limit=page_size,
+                    offset=offset,
+                    include=include
+                )
+                page_ids = page["ids"]
+                if not len(page_ids):
+                    break
+                doc_ids.extend(page_ids)
+                embedding_pages.append(np.asarray(page["embeddings"], dtype=np.float32))
+                if lean:
+                    documents_list.extend([None] * len(page_ids))
+                    metadatas_list.extend([None] * len(page_ids))
+                else:
+                    documents_list.extend(page["documents"])
+                    metadatas_list.extend(page["metadatas"])
+                # A short page is the last one; also terminates against
+                # backends that ignore limit/offset.
+                if len(page_ids) < page_size:
+                    break
+                offset += page_size
+
+            # Format results. The embeddings stay rows of one float32
+            # matrix: each entry holds a zero-copy view into it instead of a
+            # boxed per-row Python list, so downstream scoring stacks or
+            # slices without reallocating the whole corpus.
             all_embeddings = []
-            if results["embeddings"]:
-                for i in range(len(results["embeddings"])):
-                    embedding_data = {
-                        "id": results["ids"][i],
-                        "embedding": results["embeddings"][i],
-                        "document": results["documents"][i],
-                        "metadata": results["metadatas"][i]
+            if doc_ids:
+                matrix = (
+                    embedding_pages[0]
+                    if len(embedding_pages) == 1
+                    else np.concatenate(embedding_pages)
+                )
+                if settings.VECTOR_DTYPE == "float16":
+                    # Half-precision resident copy: halves what the per-scope
+                    # cache pins in RAM. Ranking upcasts rows back to float32
+                    # when it stacks its scoring matrix, so scores are
+                    # unchanged beyond fp16 rounding of the inputs.
+                    matrix = matrix.astype(np.float16)
+                all_embeddings = [
+                    {
+                        "id": doc_id,
+                        "embedding": row,
+                        "document": document,
+                        "metadata": _expand_metadata(metadata),
                     }
-                    all_embeddings.append(embedding_data)
+                    for doc_id, row, document, metadata in zip(
+                        doc_ids,
+                        matrix,
+                        documents_list,
+                        metadatas_list,
+                    )
+                ]
             
+            self._all_emb_cache[cache_key] = (
+                time.monotonic(),
+                self._data_version,
+                all_embeddings,
+            )
+
             logger.info(
                 "Retrieved %s embeddings for quantum search (session: %s, user: %s)",
                 len(all_embeddings),
@@ -365,7 +870,46 @@ class VectorStore:
         except Exception as e:
             logger.error(f"Failed to retrieve all embeddings: {e}")
             return []
-    
+
+    async def hydrate(self, document_ids: List[str]) -> List[Dict[str, Any]]:
+        """Fetch documents and metadata for a ranked id set.
+
+        Companion to get_all_embeddings(lean=True): ranking runs on vectors
+        alone, then only the surviving top-k ids pay for their document
+        strings in one targeted lookup.
+
+        Args:
+            document_ids: IDs to hydrate, typically the final ranked set
+
+        Returns:
+            List[Dict]: id, document and metadata per found id
+        """
+        if not document_ids:
+            return []
+        try:
+            collection = await self._ensure_ready()
+
+            results = await asyncio.to_thread(
+                collection.get,
+                ids=document_ids,
+                include=["documents", "metadatas"]
+            )
+            return [
+                {
+                    "id": doc_id,
+                    "document": document,
+                    "metadata": _expand_metadata(metadata),
+                }
+                for doc_id, document, metadata in zip(
+                    results["ids"],
+                    results["documents"],
+                    results["metadatas"],
+                )
+            ]
+        except Exception as e:
+            logger.error(f"Failed to hydrate documents: {e}")
+            return []
+
     async def delete_documents(self, document_ids: List[str]) -> Dict[str, Any]:
         """Delete documents from the vector store.
         
@@ -376,24 +920,46 @@ class VectorStore:
             dict: Deletion result
         """
         try:
-            if not self.collection:
-                await self.initialize()
+            collection = await self._ensure_ready()
             
             logger.info(f"Deleting {len(document_ids)} documents")
             
-            # Delete documents
-            self.collection.delete(ids=document_ids)
-            
+            # Delete in bounded batches off the event loop: one huge
+            # DELETE ... WHERE id IN (...) holds the database lock for the
+            # whole list, while smaller transactions commit quickly and let
+            # concurrent reads interleave.
+            batch_size = max(settings.CHROMA_DELETE_BATCH_SIZE, 1)
+            deleted_count = 0
+            failed_batches = []
+            for start in range(0, len(document_ids), batch_size):
+                batch = document_ids[start:start + batch_size]
+                try:
+                    await asyncio.to_thread(collection.delete, ids=batch)
+                    deleted_count += len(batch)
+                except Exception as batch_error:
+                    logger.error(
+                        f"Failed to delete batch {start}-{start + len(batch)}: {batch_error}"
+                    )
+                    failed_batches.append(start)
+
             # Get updated count
-            remaining_count = self.collection.count()
-            
+            remaining_count = collection.count()
+            if deleted_count:
+                self._data_version += 1
+                self._known_empty = remaining_count == 0
+                self._stats_cache = None
+                self._all_emb_cache.clear()
+                self._query_cache.clear()
+
             result = {
-                "success": True,
-                "deleted_count": len(document_ids),
+                "success": not failed_batches,
+                "deleted_count": deleted_count,
                 "remaining_documents": remaining_count
             }
-            
-            logger.info(f"Successfully deleted {len(document_ids)} documents")
+            if failed_batches:
+                result["failed_batches"] = failed_batches
+
+            logger.info(f"Successfully deleted {deleted_count} documents")
             return result
             
         except Exception as e:
@@ -419,31 +985,33 @@ class VectorStore:
             List[Dict]: Filtered documents
         """
         try:
-            if not self.collection:
-                await self.initialize()
+            collection = await self._ensure_ready()
             
             chroma_where = self._build_chroma_where(metadata=where)
             logger.info(f"Searching by metadata: {where}")
             logger.info("Metadata search Chroma filter: %s", chroma_where)
             
             # Perform metadata search
-            results = self.collection.get(
+            results = collection.get(
                 where=chroma_where,
                 limit=n_results,
                 include=["documents", "metadatas"]
             )
             
-            # Format results
-            formatted_results = []
-            if results["documents"]:
-                for i in range(len(results["documents"])):
-                    result = {
-                        "id": results["ids"][i],
-                        "document": results["documents"][i],
-                        "metadata": results["metadatas"][i]
-                    }
-                    formatted_results.append(result)
-            
+            # Format results in one pass over the parallel columns
+            formatted_results = [
+                {
+                    "id": doc_id,
+                    "document": document,
+                    "metadata": _expand_metadata(metadata),
+                }
+                for doc_id, document, metadata in zip(
+                    results["ids"],
+                    results["documents"],
+                    results["metadatas"],
+                )
+            ]
+
             logger.info(f"Found {len(formatted_results)} documents matching metadata")
             return formatted_results
             
@@ -451,6 +1019,39 @@ class VectorStore:
             logger.error(f"Metadata search failed: {e}")
             return []
     
+    async def get_by_id(self, document_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a single document (with embedding) by its id.
+
+        A Chroma point lookup, so finding one row no longer materializes
+        the whole collection.
+
+        Args:
+            document_id: ID of the document to fetch
+
+        Returns:
+            Dict with id, embedding, document and metadata, or None if absent
+        """
+        try:
+            collection = await self._ensure_ready()
+
+            results = collection.get(
+                ids=[document_id],
+                include=["embeddings", "documents", "metadatas"]
+            )
+            if not results["ids"]:
+                return None
+
+            return {
+                "id": results["ids"][0],
+                "embedding": results["embeddings"][0],
+                "document": results["documents"][0],
+                "metadata": _expand_metadata(results["metadatas"][0]),
+            }
+
+        except Exception as e:
+            logger.error(f"Failed to fetch document '{document_id}': {e}")
+            return None
+
     async def get_collection_stats(self) -> Dict[str, Any]:
         """Get statistics about the vector store collection.
         
@@ -458,13 +1059,21 @@ class VectorStore:
             dict: Collection statistics
         """
         try:
-            if not self.collection:
-                await self.initialize()
-            
-            count = self.collection.count()
+            # Stats only change on mutation (which clears this cache), so a
+            # short TTL removes one Chroma round trip from every search.
+            if (
+                self._stats_cache is not None
+                and time.monotonic() - self._stats_cache[0] < STATS_CACHE_TTL_SECONDS
+            ):
+                return self._stats_cache[1]
+
+            collection = await self._ensure_ready()
             
+            count = collection.count()
+            self._known_empty = count == 0
+
             # Get sample metadata to understand data structure
-            sample = self.collection.peek(limit=1)
+            sample = collection.peek(limit=1)
             
             stats = {
                 "collection_name": self.collection_name,
@@ -476,6 +1085,7 @@ class VectorStore:
             if sample["metadatas"] and len(sample["metadatas"]) > 0:
                 stats["sample_metadata_keys"] = list(sample["metadatas"][0].keys())
             
+            self._stats_cache = (time.monotonic(), stats)
             return stats
             
         except Exception as e:
@@ -495,8 +1105,7 @@ class VectorStore:
             dict: Reset operation result
         """
         try:
-            if not self.collection:
-                await self.initialize()
+            collection = await self._ensure_ready()
             
             logger.warning("Resetting collection - all data will be lost!")
             
@@ -506,10 +1115,15 @@ class VectorStore:
             # Recreate empty collection
             self.collection = self.client.create_collection(
                 name=self.collection_name,
-                metadata={"description": "PDF document embeddings for chatbot"},
+                metadata=_hnsw_metadata("PDF document embeddings for chatbot"),
                 embedding_function=None
             )
-            
+            self._data_version += 1
+            self._known_empty = True
+            self._stats_cache = None
+            self._all_emb_cache.clear()
+            self._query_cache.clear()
+
             result = {
                 "success": True,
                 "message": "Collection reset successfully",
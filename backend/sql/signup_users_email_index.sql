@@ -0,0 +1,6 @@
+-- Unique index backing the email point lookups in DatabaseService
+-- (get_user_by_email) and the on_conflict='email' upsert used at signup.
+-- Run once against the Supabase project; IF NOT EXISTS makes it safe to
+-- re-apply.
+CREATE UNIQUE INDEX IF NOT EXISTS signup_users_email_idx
+    ON signup_users (email);
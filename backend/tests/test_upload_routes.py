@@ -0,0 +1,257 @@
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+os.environ.setdefault("DEBUG", "false")
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import routes.chat_routes as chat_routes_module
+import routes.pdf_routes as pdf_routes_module
+from routes.chat_routes import router as chat_router
+from routes.pdf_routes import _reuse_existing_chunks, router as pdf_router
+from services.shared import get_pdf_processor, get_quantum_search, get_vector_store
+
+
+PDF_BYTES = b"%PDF-1.4 test payload"
+
+
+def build_stored_chunks(file_hash: str, session_id: str, count: int = 3):
+    chunks = []
+    for index in range(count):
+        chunks.append(
+            {
+                "id": f"stored-{index}",
+                "embedding": [float(index), 1.0],
+                "document": f"chunk body {index}",
+                "metadata": {
+                    "file_hash": file_hash,
+                    "chunk_id": index,
+                    "session_id": session_id,
+                    "file_size": 1024,
+                    "num_pages": 2,
+                    "title": "Stored Doc",
+                    "author": "Author",
+                },
+            }
+        )
+    return chunks
+
+
+class FakeDedupeVectorStore:
+    def __init__(self, chunks=None):
+        self.chunks = list(chunks or [])
+
+    async def get_all_embeddings(self, session_id=None, user_id=None, metadata=None, lean=False):
+        file_hash = (metadata or {}).get("file_hash")
+        return [
+            chunk
+            for chunk in self.chunks
+            if chunk["metadata"].get("file_hash") == file_hash
+        ]
+
+
+class QueuedUploadTests(unittest.TestCase):
+    def setUp(self):
+        # The worker pool binds to the event loop of the client that first
+        # touched it; reset the module state so each test gets fresh workers.
+        pdf_routes_module._upload_queue = None
+        pdf_routes_module._upload_workers.clear()
+        pdf_routes_module._upload_jobs.clear()
+
+    tearDown = setUp
+
+    def _build_pdf_client(self):
+        app = FastAPI()
+        app.include_router(pdf_router, prefix="/api/v1")
+        app.dependency_overrides[get_vector_store] = lambda: FakeDedupeVectorStore()
+        return TestClient(app)
+
+    def _poll_job(self, client, job_id, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            response = client.get(f"/api/v1/upload_pdf/{job_id}")
+            self.assertEqual(response.status_code, 200, response.text)
+            job = response.json()
+            if job["status"] in ("completed", "failed"):
+                return job
+            time.sleep(0.05)
+        self.fail(f"Upload job {job_id} did not finish within {timeout}s")
+
+    def test_queued_upload_returns_202_and_job_reaches_completed(self):
+        async def fake_process(file_path, filename, vector_store, session_id=None, user_id=None, file_hash=None):
+            return {
+                "success": True,
+                "chunks_count": 3,
+                "file_metadata": {"file_hash": file_hash},
+            }
+
+        with patch.object(pdf_routes_module, "_process_pdf_background", side_effect=fake_process):
+            with self._build_pdf_client() as client:
+                response = client.post(
+                    "/api/v1/upload_pdf?wait=false",
+                    files={"file": ("doc.pdf", PDF_BYTES, "application/pdf")},
+                    data={"session_id": "session-1"},
+                )
+                self.assertEqual(response.status_code, 202, response.text)
+                accepted = response.json()
+                self.assertTrue(accepted["success"])
+                self.assertEqual(accepted["status"], "queued")
+                self.assertEqual(accepted["file_name"], "doc.pdf")
+
+                job = self._poll_job(client, accepted["job_id"])
+
+        self.assertEqual(job["status"], "completed")
+        self.assertEqual(job["chunks_created"], 3)
+        self.assertEqual(job["file_name"], "doc.pdf")
+
+    def test_queued_upload_failure_is_reported_on_the_job(self):
+        async def fake_process(file_path, filename, vector_store, session_id=None, user_id=None, file_hash=None):
+            return {"success": False, "error": "extraction failed"}
+
+        with patch.object(pdf_routes_module, "_process_pdf_background", side_effect=fake_process):
+            with self._build_pdf_client() as client:
+                response = client.post(
+                    "/api/v1/upload_pdf?wait=false",
+                    files={"file": ("doc.pdf", PDF_BYTES, "application/pdf")},
+                )
+                self.assertEqual(response.status_code, 202, response.text)
+
+                job = self._poll_job(client, response.json()["job_id"])
+
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["error"], "extraction failed")
+
+    def test_unknown_job_id_returns_404(self):
+        with self._build_pdf_client() as client:
+            response = client.get("/api/v1/upload_pdf/not-a-real-job")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class DeduplicationTests(unittest.IsolatedAsyncioTestCase):
+    async def test_unknown_hash_falls_through_to_full_pipeline(self):
+        vector_store = FakeDedupeVectorStore()
+
+        result = await _reuse_existing_chunks(
+            vector_store, "hash-1", "doc.pdf", session_id="session-1"
+        )
+
+        self.assertIsNone(result)
+
+    async def test_same_session_duplicate_reuses_chunks_without_writing(self):
+        vector_store = FakeDedupeVectorStore(build_stored_chunks("hash-1", "session-1"))
+
+        result = await _reuse_existing_chunks(
+            vector_store, "hash-1", "doc.pdf", session_id="session-1"
+        )
+
+        self.assertTrue(result["deduplicated"])
+        self.assertEqual(result["chunks_count"], 3)
+        self.assertEqual(result["embedded_chunks"], [])
+        self.assertEqual(result["file_metadata"]["file_hash"], "hash-1")
+        self.assertEqual(result["file_metadata"]["title"], "Stored Doc")
+
+    async def test_other_session_duplicate_copies_chunks_into_new_scope(self):
+        stored = build_stored_chunks("hash-1", "session-1")
+        stored.reverse()  # Arrival order must not dictate chunk order.
+        vector_store = FakeDedupeVectorStore(stored)
+
+        result = await _reuse_existing_chunks(
+            vector_store, "hash-1", "copy.pdf", session_id="session-2"
+        )
+
+        self.assertTrue(result["deduplicated"])
+        self.assertEqual(len(result["embedded_chunks"]), 3)
+        self.assertEqual(
+            [chunk["text"] for chunk in result["embedded_chunks"]],
+            ["chunk body 0", "chunk body 1", "chunk body 2"],
+        )
+        for chunk in result["embedded_chunks"]:
+            self.assertNotIn("session_id", chunk["metadata"])
+            self.assertNotIn("user_id", chunk["metadata"])
+            self.assertEqual(chunk["metadata"]["file_hash"], "hash-1")
+
+
+class ChatStreamingTests(unittest.TestCase):
+    def _build_chat_client(self):
+        app = FastAPI()
+        app.include_router(chat_router, prefix="/api")
+        app.dependency_overrides[get_vector_store] = lambda: FakeDedupeVectorStore()
+        app.dependency_overrides[get_quantum_search] = lambda: object()
+        app.dependency_overrides[get_pdf_processor] = lambda: object()
+        return TestClient(app)
+
+    @staticmethod
+    def _parse_sse_frames(body: str):
+        return [
+            json.loads(line[len("data: "):])
+            for line in body.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_chat_stream_emits_deltas_and_final_done_frame(self):
+        async def fake_stream(user_message, context, temperature):
+            for delta in ["Hello", " ", "world"]:
+                yield delta
+
+        with patch.object(chat_routes_module.settings, "GEMINI_API_KEY", "test-key"):
+            with patch.object(chat_routes_module, "_stream_gemini_response", fake_stream):
+                with self._build_chat_client() as client:
+                    response = client.post(
+                        "/api/chat",
+                        json={
+                            "message": "say hello",
+                            "user_id": 1,
+                            "session_id": "session-1",
+                            "use_context": False,
+                            "stream": True,
+                            "temperature": 0.7,
+                        },
+                    )
+
+        self.assertEqual(response.status_code, 200, response.text)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+
+        frames = self._parse_sse_frames(response.text)
+        deltas = [frame["delta"] for frame in frames if "delta" in frame]
+        self.assertEqual("".join(deltas), "Hello world")
+
+        final = frames[-1]
+        self.assertTrue(final["done"])
+        self.assertNotIn("error", final)
+        self.assertEqual(final["session_id"], "session-1")
+        self.assertFalse(final["context_used"])
+
+    def test_chat_stream_reports_failure_in_terminal_frame(self):
+        async def broken_stream(user_message, context, temperature):
+            yield "partial"
+            raise RuntimeError("stream died")
+
+        with patch.object(chat_routes_module.settings, "GEMINI_API_KEY", "test-key"):
+            with patch.object(chat_routes_module, "_stream_gemini_response", broken_stream):
+                with self._build_chat_client() as client:
+                    response = client.post(
+                        "/api/chat",
+                        json={
+                            "message": "say hello",
+                            "user_id": 1,
+                            "session_id": "session-1",
+                            "use_context": False,
+                            "stream": True,
+                            "temperature": 0.7,
+                        },
+                    )
+
+        self.assertEqual(response.status_code, 200, response.text)
+        frames = self._parse_sse_frames(response.text)
+        final = frames[-1]
+        self.assertTrue(final["done"])
+        self.assertEqual(final["error"], "stream died")
+
+
+if __name__ == "__main__":
+    unittest.main()